@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Shared in-memory store for the Westworld markdown corpus.
+Every canon and scene file is discovered and parsed exactly once; generators
+and checkers then look entities up by ID instead of re-reading files from disk.
+"""
+
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from fast_frontmatter import parse_frontmatter
+from parse_cache import ParseCache, content_key
+from sections import SectionIndex, scan_sections
+
+# Canon entity kinds and the directories they live in, relative to the repo root
+CANON_DIRS = {
+    'character': Path('canon') / 'characters',
+    'location': Path('canon') / 'locations',
+    'theme': Path('canon') / 'themes',
+    'timeline': Path('canon') / 'timeline',
+}
+
+# Scenes live one directory per episode, e.g. story/scenes/s01e01/
+SCENES_DIR = Path('story') / 'scenes'
+
+KINDS = tuple(CANON_DIRS) + ('scene',)
+
+
+class CanonEntry:
+    """A parsed markdown file: frontmatter metadata plus body content"""
+
+    __slots__ = ('kind', 'path', 'metadata', 'content', 'sections', 'error', 'digest')
+
+    def __init__(self, kind: str, path: Path, metadata: Dict, content: str,
+                 spans: Optional[Dict] = None, error: Optional[str] = None, digest: Optional[str] = None):
+        self.kind = kind
+        self.path = path
+        self.metadata = metadata
+        self.content = content
+        self.sections = SectionIndex(content, spans)
+        self.error = error
+        # Content hash of the source file, used for change detection
+        self.digest = digest
+
+    @property
+    def id(self) -> str:
+        return self.metadata.get('id', '')
+
+    def get(self, key: str, default=None):
+        return self.metadata.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.metadata
+
+    def __repr__(self) -> str:
+        return f"CanonEntry({self.kind}, {self.id or self.path.name})"
+
+
+def parse_text(text: str):
+    """Parse file text into (metadata, content, section spans)"""
+    metadata, content = parse_frontmatter(text)
+    return metadata, content, scan_sections(content)
+
+
+def parse_entry(kind: str, path: Path, cache: Optional[ParseCache] = None) -> CanonEntry:
+    """Parse a single markdown file, recording parse failures on the entry"""
+    key = None
+    try:
+        if cache is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            key = content_key(data)
+            return CanonEntry(kind, path, *parse_text(data.decode('utf-8')), digest=key)
+
+        st = os.stat(path)
+        known = cache.lookup_stat(path, st)
+        if known is not None:
+            key, parsed = known
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+            key = content_key(data)
+            parsed = cache.lookup(key)
+            if parsed is None:
+                parsed = parse_text(data.decode('utf-8'))
+                cache.store(path, st, key, parsed)
+            else:
+                cache.remember(path, st, key)
+        return CanonEntry(kind, path, *parsed, digest=key)
+    except Exception as e:
+        return CanonEntry(kind, path, {}, '', error=str(e), digest=key)
+
+
+def pool_context():
+    """Prefer fork so worker processes inherit already-loaded state without pickling it"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+
+def parse_entries(items: List[Tuple[str, Path]], cache: Optional[ParseCache] = None,
+                  jobs: int = 1) -> List[CanonEntry]:
+    """Parse (kind, path) pairs in order, spreading cache misses over `jobs` processes"""
+    if jobs <= 1:
+        return [parse_entry(kind, path, cache) for kind, path in items]
+
+    entries: List[Optional[CanonEntry]] = [None] * len(items)
+    misses = []
+    for i, (kind, path) in enumerate(items):
+        st = None
+        if cache is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                pass
+            known = cache.lookup_stat(path, st) if st is not None else None
+            if known is not None:
+                entries[i] = CanonEntry(kind, path, *known[1], digest=known[0])
+                continue
+        misses.append((i, st))
+
+    if len(misses) > 1:
+        kinds = [items[i][0] for i, _ in misses]
+        paths = [items[i][1] for i, _ in misses]
+        chunksize = max(1, len(misses) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=pool_context()) as pool:
+            parsed = list(pool.map(parse_entry, kinds, paths, chunksize=chunksize))
+    else:
+        parsed = [parse_entry(items[i][0], items[i][1]) for i, _ in misses]
+
+    for (i, st), entry in zip(misses, parsed):
+        entries[i] = entry
+        # The stat taken before the file was read is the safe one to remember
+        if cache is not None and st is not None and not entry.error:
+            cache.store(entry.path, st, entry.digest, (entry.metadata, entry.content, entry.sections.spans))
+    return entries
+
+
+class EntityTable(dict):
+    """ID lookup table that reports every lookup to its store's recorder"""
+
+    __slots__ = ('store',)
+
+    def __init__(self, store: 'CanonStore'):
+        super().__init__()
+        self.store = store
+
+    def get(self, entity_id: str, default=None):
+        entry = dict.get(self, entity_id)
+        self.store.record(entity_id, entry)
+        return default if entry is None else entry
+
+    def __getitem__(self, entity_id: str) -> CanonEntry:
+        entry = dict.get(self, entity_id)
+        self.store.record(entity_id, entry)
+        if entry is None:
+            raise KeyError(entity_id)
+        return entry
+
+    def __contains__(self, entity_id: str) -> bool:
+        entry = dict.get(self, entity_id)
+        self.store.record(entity_id, entry)
+        return entry is not None
+
+
+class CanonStore:
+    """All characters, locations, themes, timeline events and scenes, keyed by ID"""
+
+    def __init__(self, repo_root: Path = Path("."), cache: Optional[ParseCache] = None, use_cache: bool = True,
+                 jobs: int = 1, select: Optional[Callable[[str, Path], bool]] = None):
+        self.repo_root = Path(repo_root)
+        # Worker processes used to parse files missing from the cache
+        self.jobs = jobs
+        # Only files for which select(kind, path) is true are loaded, e.g. one shard's
+        self.select = select
+        if cache is None and use_cache:
+            cache = ParseCache.for_repo(self.repo_root)
+        self.cache = cache
+        # ID -> source digest of every lookup made inside recording()
+        self._reads: Optional[Dict[str, Optional[str]]] = None
+        self.characters: Dict[str, CanonEntry] = EntityTable(self)
+        self.locations: Dict[str, CanonEntry] = EntityTable(self)
+        self.themes: Dict[str, CanonEntry] = EntityTable(self)
+        self.timeline: Dict[str, CanonEntry] = EntityTable(self)
+        self.scenes: Dict[str, CanonEntry] = EntityTable(self)
+        # Every parsed file per kind in sorted path order, including failures
+        self.entries: Dict[str, List[CanonEntry]] = {kind: [] for kind in KINDS}
+        self.by_id: Dict[str, CanonEntry] = {}
+        # ID -> every file claiming it, for IDs defined more than once
+        self.duplicates: Dict[str, List[Path]] = {}
+        # kind -> listing_digest(kind), and parts_digest() results, until the corpus next changes
+        self._listings: Dict[str, str] = {}
+        self.load()
+
+    def directory(self, kind: str) -> Path:
+        """Return the source directory for an entity kind"""
+        if kind == 'scene':
+            return self.repo_root / SCENES_DIR
+        return self.repo_root / CANON_DIRS[kind]
+
+    def discover(self, kind: str) -> List[Path]:
+        """List the markdown files for an entity kind, skipping index pages"""
+        directory = self.directory(kind)
+        if not directory.exists():
+            return []
+        pattern = "*/*.md" if kind == 'scene' else "*.md"
+        return sorted(p for p in directory.glob(pattern)
+                      if p.name != "index.md" and (self.select is None or self.select(kind, p)))
+
+    def load(self):
+        """Discover and parse the whole corpus"""
+        items = [(kind, path) for kind in KINDS for path in self.discover(kind)]
+        entries = parse_entries(items, self.cache, self.jobs)
+        for kind in KINDS:
+            self.entries[kind] = []
+        for entry in entries:
+            self.entries[entry.kind].append(entry)
+        self._index()
+        if self.cache is not None:
+            self.cache.save()
+
+    def refresh(self, paths) -> List[CanonEntry]:
+        """Re-parse changed files in place and return the entries that now exist for them"""
+        changed = {Path(p) for p in paths}
+        updated = []
+        for kind in KINDS:
+            directory = self.directory(kind)
+            if not any(directory in path.parents for path in changed):
+                continue
+            current = {entry.path: entry for entry in self.entries[kind]}
+            entries = []
+            for path in self.discover(kind):
+                entry = current.get(path)
+                if entry is None or path in changed:
+                    entry = parse_entry(kind, path, self.cache)
+                    updated.append(entry)
+                entries.append(entry)
+            self.entries[kind] = entries
+        self._index()
+        if self.cache is not None:
+            self.cache.save()
+        return updated
+
+    def _index(self):
+        """Rebuild the ID lookup tables from the parsed entries in one pass"""
+        self.by_id = {}
+        self.duplicates = {}
+        self._listings = {}
+        for kind in KINDS:
+            table = self.table(kind)
+            table.clear()
+            for entry in self.entries[kind]:
+                if entry.error or not entry.id:
+                    continue
+                previous = self.by_id.get(entry.id)
+                if previous is not None:
+                    self.duplicates.setdefault(entry.id, [previous.path]).append(entry.path)
+                table[entry.id] = entry
+                self.by_id[entry.id] = entry
+
+    def table(self, kind: str) -> Dict[str, CanonEntry]:
+        """Return the ID lookup table for an entity kind"""
+        return {
+            'character': self.characters,
+            'location': self.locations,
+            'theme': self.themes,
+            'timeline': self.timeline,
+            'scene': self.scenes,
+        }[kind]
+
+    def get(self, entity_id: str) -> Optional[CanonEntry]:
+        """Look up any entity by ID"""
+        entry = self.by_id.get(entity_id)
+        self.record(entity_id, entry)
+        return entry
+
+    def record(self, entity_id: str, entry: Optional[CanonEntry]):
+        """Note a lookup while a recording is active"""
+        if self._reads is not None:
+            self._reads[entity_id] = entry.digest if entry is not None else None
+
+    @contextmanager
+    def recording(self):
+        """Collect the ID -> digest of every entity looked up inside the block"""
+        previous = self._reads
+        self._reads = {}
+        try:
+            yield self._reads
+        finally:
+            self._reads = previous
+
+    def listing_digest(self, kind: str) -> str:
+        """Fingerprint of every file of a kind, changing when any is added, removed or edited"""
+        if kind not in self._listings:
+            digest = hashlib.sha256()
+            directory = self.directory(kind)
+            for entry in self.entries[kind]:
+                digest.update(f"{entry.path.relative_to(directory)}\0{entry.digest}\n".encode())
+            self._listings[kind] = digest.hexdigest()
+        return self._listings[kind]
+
+    def parts_digest(self, kind: str, fields: Tuple[str, ...] = (), sections: Tuple[str, ...] = ()) -> str:
+        """Fingerprint of just the given frontmatter fields and sections of every file of a kind,
+        unaffected by edits to the rest of those files"""
+        key = f"{kind}:{','.join(fields)}:{','.join(sections)}"
+        if key not in self._listings:
+            digest = hashlib.sha256()
+            directory = self.directory(kind)
+            for entry in self.entries[kind]:
+                parts = (entry.error, [entry.get(field) for field in fields],
+                         [entry.sections.get(section, '') for section in sections])
+                digest.update(f"{entry.path.relative_to(directory)}\0{parts!r}\n".encode())
+            self._listings[key] = digest.hexdigest()
+        return self._listings[key]
+
+    def __iter__(self) -> Iterator[CanonEntry]:
+        for kind in KINDS:
+            yield from self.entries[kind]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.entries.values())
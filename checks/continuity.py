@@ -1,129 +1,407 @@
 #!/usr/bin/env python3
 """Continuity checking for Westworld story framework."""
 
-import yaml
+import importlib
+import subprocess
+import sys
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import click
 from rich.console import Console
 from rich.table import Table
 
+from canon_store import CanonEntry, CanonStore
+from fast_frontmatter import parse_frontmatter
+from id_index import REFERENCE_EXTRACTORS, IdIndex, IndexRecord, as_list
+from lifespans import DEATH_EVENT_RE, Lifespans, episode_key
+from reachability import WORLD_FILE, LocationGraph
+from reporting import FORMATS, Finding, Reporter
+from sharding import Shard, shard_option
+
 console = Console()
 
+# How each entity kind is named in issue messages
+KIND_LABELS = {
+    'character': 'character',
+    'location': 'location',
+    'theme': 'theme',
+    'timeline': 'timeline event',
+    'scene': 'scene',
+}
+
+
+class ReferenceResolver:
+    """Resolves entity references against the global ID index in O(1) each"""
+
+    def __init__(self, index: IdIndex):
+        self.index = index
+        self.resolved = 0
+
+    def check(self, ref, kind: str) -> Optional[str]:
+        """Return a problem description if ref does not name an entity of the expected kind"""
+        self.resolved += 1
+        entry = self.index.by_id.get(ref) if isinstance(ref, str) else None
+        if entry is None:
+            return f"Unknown {KIND_LABELS[kind]} {ref}"
+        if entry.kind != kind:
+            return f"{ref} is a {KIND_LABELS[entry.kind]}, not a {KIND_LABELS[kind]}"
+        return None
+
+
+class ContinuityCheck:
+    """A registered check: per-file for the listed kinds, or corpus-wide if kinds is None"""
+
+    __slots__ = ('name', 'func', 'kinds')
+
+    def __init__(self, name: str, func: Callable, kinds: Optional[Tuple[str, ...]]):
+        self.name = name
+        self.func = func
+        self.kinds = kinds
+
+
+# Registered checks in the order they report
+CHECKS: Dict[str, ContinuityCheck] = {}
+
+
+def register_check(name: str, kinds: Optional[Iterable[str]] = None):
+    """Register a continuity check under a result name.
+
+    With kinds, the check is called as func(checker, entry) for every parsed
+    file of those kinds during the shared pass; without, it is called once as
+    func(checker) after the pass. Either way it returns an iterable of issues,
+    each a message string or a Finding; messages from per-file checks are
+    attributed to the file being visited.
+    """
+    def decorator(func: Callable) -> Callable:
+        CHECKS[name] = ContinuityCheck(name, func, tuple(kinds) if kinds is not None else None)
+        return func
+    return decorator
+
+
+def entry_label(entry: CanonEntry) -> str:
+    return f"{'Scene' if entry.kind == 'scene' else 'Timeline'} {entry.path.stem}"
+
+
+def reference_issues(checker: 'ContinuityChecker', entry: CanonEntry, kind: str) -> Iterator[str]:
+    """Resolve the references of one kind made by a file"""
+    for ref_kind, ref in checker.references(entry):
+        if ref_kind == kind:
+            problem = checker.resolver.check(ref, kind)
+            if problem:
+                yield f"{entry_label(entry)}: {problem}"
+
+
+@register_check('id_index')
+def check_id_index(checker: 'ContinuityChecker') -> List[Finding]:
+    """Check that every file parsed and every ID is defined once"""
+    issues = [Finding(f"Failed to parse {entry.path}: {entry.error}", entry.path) for entry in checker.failed]
+    for entity_id, paths in checker.index.duplicates.items():
+        if checker.scope is not None and entity_id not in checker.scope:
+            continue
+        if checker.shard is not None and not checker.shard.owns(entity_id):
+            continue
+        issues.append(Finding(f"Duplicate ID {entity_id} in {', '.join(p.name for p in paths)}",
+                              paths[-1], entity_id))
+    return issues
+
+
+@register_check('character_references', kinds=('timeline', 'scene'))
+def check_character_references(checker: 'ContinuityChecker', entry: CanonEntry) -> Iterator[str]:
+    """Check that characters in scenes and timeline events exist in canon"""
+    return reference_issues(checker, entry, 'character')
+
+
+@register_check('location_references', kinds=('scene',))
+def check_location_references(checker: 'ContinuityChecker', entry: CanonEntry) -> Iterator[str]:
+    """Check that every scene's location exists in canon"""
+    return reference_issues(checker, entry, 'location')
+
+
+@register_check('theme_references', kinds=('scene',))
+def check_theme_references(checker: 'ContinuityChecker', entry: CanonEntry) -> Iterator[str]:
+    """Check that every scene's themes exist in canon"""
+    return reference_issues(checker, entry, 'theme')
+
+
+@register_check('timeline_consistency', kinds=('timeline', 'scene'))
+def check_timeline_consistency(checker: 'ContinuityChecker', entry: CanonEntry) -> Iterator[str]:
+    """Check that characters only appear within their lifespan"""
+    lifespans = checker.lifespans()
+    # Characters present only as memories or flashbacks may appear after death
+    remembered = set(as_list(entry.get('remembered_characters')))
+    for ref_kind, char_id in checker.references(entry):
+        if ref_kind != 'character' or char_id in remembered:
+            continue
+        if entry.kind == 'timeline':
+            problem = lifespans.check_year(char_id, entry.get('date'))
+        else:
+            problem = lifespans.check_episode(char_id, entry.get('episode'))
+        if problem:
+            yield f"{entry_label(entry)}: {problem}"
+
+
+def scene_order(scene: CanonEntry) -> Optional[Tuple]:
+    """Sort key for a scene ID like S01E01-003, or None if it is malformed"""
+    episode, _, number = scene.id.rpartition('-')
+    key = episode_key(episode)
+    return (key, int(number)) if key is not None and number.isdigit() else None
+
+
+@register_check('location_reachability')
+def check_location_reachability(checker: 'ContinuityChecker') -> List[Finding]:
+    """Check that characters can travel between the locations of their consecutive scenes"""
+    graph = checker.location_graph()
+    # Scenes come from the index so travel into and out of other shards is seen
+    # Stable on the key alone, so scenes sharing an ID keep their file order
+    scenes = sorted(((key, scene) for scene in checker.index.entries['scene']
+                     if not scene.error and (key := scene_order(scene)) is not None),
+                    key=lambda pair: pair[0])
+
+    issues = []
+    # Character ID -> (scene, location) of their latest appearance so far
+    last_seen: Dict[str, Tuple[CanonEntry, str]] = {}
+    for _, scene in scenes:
+        location = scene.get('location')
+        if not isinstance(location, str) or location not in graph:
+            continue
+        for ref_kind, char_id in checker.references(scene):
+            if ref_kind != 'character':
+                continue
+            previous = last_seen.get(char_id)
+            last_seen[char_id] = (scene, location)
+            if previous is None:
+                continue
+            if (checker.scope is not None and not checker.world_changed
+                    and scene.id not in checker.scope and previous[0].id not in checker.scope):
+                continue
+            if checker.shard is not None and not checker.shard.owns(scene.id):
+                continue
+            hops = graph.distance(previous[1], location)
+            move = f"{char_id} moves from {previous[1]} ({previous[0].path.stem}) to {location}"
+            if hops is None:
+                issues.append(Finding(f"Scene {scene.path.stem}: {move}, which is unreachable",
+                                      scene.path, scene.id))
+            elif checker.max_hops is not None and hops > checker.max_hops:
+                issues.append(Finding(f"Scene {scene.path.stem}: {move}, {hops} hops away (max {checker.max_hops})",
+                                      scene.path, scene.id))
+    return issues
+
+
+def build_reverse_index(store: CanonStore) -> Dict[str, List[CanonEntry]]:
+    """Map every referenced ID to the files that refer to it"""
+    referrers: Dict[str, List[CanonEntry]] = {}
+    for kind, extract in REFERENCE_EXTRACTORS.items():
+        for entry in store.entries[kind]:
+            if entry.error:
+                continue
+            for ref in dict.fromkeys(ref for _, ref in extract(entry)):
+                if isinstance(ref, str):
+                    referrers.setdefault(ref, []).append(entry)
+    return referrers
+
+
+def git(repo_root: Path, *args: str, input: Optional[bytes] = None) -> bytes:
+    return subprocess.run(['git', '-C', str(repo_root), *args], input=input,
+                          capture_output=True, check=True).stdout
+
+
+def git_changes(repo_root: Path, since: str) -> Tuple[List[Path], Set[str]]:
+    """Markdown files and world.yml changed since a git ref (committed, uncommitted
+    or untracked) and the IDs the markdown files had at that ref"""
+    top = Path(git(repo_root, 'rev-parse', '--show-toplevel').decode().strip())
+    world = (Path(repo_root).resolve() / WORLD_FILE).relative_to(top.resolve()).as_posix()
+    names = git(repo_root, 'diff', '--name-only', '--no-renames', since, '--').decode().splitlines()
+    names += git(repo_root, 'ls-files', '--others', '--exclude-standard', '--full-name').decode().splitlines()
+    names = set(names)
+    changed = sorted(name for name in names if name.endswith('.md') or name == world)
+    names = [name for name in changed if name.endswith('.md')]
+
+    # Read every old version in one git process; deleted files and changed IDs
+    # are only visible there
+    old_ids = set()
+    if names:
+        request = ''.join(f"{since}:{name}\n" for name in names).encode()
+        output = git(repo_root, 'cat-file', '--batch', input=request)
+        pos = 0
+        for _ in names:
+            header_end = output.index(b'\n', pos)
+            header = output[pos:header_end].split()
+            pos = header_end + 1
+            if header[-1] == b'missing':
+                continue
+            size = int(header[2])
+            text = output[pos:pos + size].decode('utf-8', errors='replace')
+            pos += size + 1
+            try:
+                old_id = parse_frontmatter(text)[0].get('id')
+            except Exception:
+                continue
+            if isinstance(old_id, str):
+                old_ids.add(old_id)
+
+    return [top / name for name in changed], old_ids
+
+
 class ContinuityChecker:
-    def __init__(self, repo_root: Path = Path(".")):
+    def __init__(self, repo_root: Path = Path("."), store: Optional[CanonStore] = None,
+                 max_hops: Optional[int] = None, reporter: Optional[Reporter] = None,
+                 index: Optional[IdIndex] = None, shard: Optional[Shard] = None):
         self.repo_root = repo_root
+        self.store = store
+        # Every file in the corpus, for lookups across files this run may not parse
+        self.index = index
+        # The slice of the corpus whose files this run checks, or None for all of it
+        self.shard = shard
+        self.reporter = reporter if reporter is not None else Reporter('continuity', echo=console.print)
+        # Furthest a character may travel between consecutive scenes (None = any reachable location)
+        self.max_hops = max_hops
+        self.resolver: Optional[ReferenceResolver] = None
         self.characters = {}
         self.locations = {}
         self.timeline = {}
+        self.failed: List[CanonEntry] = []
+        self._lifespans: Optional[Lifespans] = None
+        self._location_graph: Optional[LocationGraph] = None
+        # IDs whose checks are in scope, or None when checking everything
+        self.scope: Optional[Set[str]] = None
+        # Set when world.yml changed, since any move between scenes may then become unreachable
+        self.world_changed = False
         self.issues = []
+        # References of the file currently being visited, extracted once for all checks
+        self._references: Tuple[Optional[CanonEntry], List[Tuple[str, str]]] = (None, [])
 
     def load_canon(self):
-        """Load all canon files"""
-        # Load characters
-        char_file = self.repo_root / "canon" / "characters.yml"
-        if char_file.exists():
-            with open(char_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                self.characters = {char['id']: char for char in data.get('characters', [])}
-
-        # Load world
-        world_file = self.repo_root / "canon" / "world.yml"
-        if world_file.exists():
-            with open(world_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                self.locations = {loc['id']: loc for loc in data.get('locations', [])}
-
-        # Load timeline
-        timeline_file = self.repo_root / "canon" / "timeline.yml"
-        if timeline_file.exists():
-            with open(timeline_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                self.timeline = {event['id']: event for event in data.get('events', [])}
-
-    def check_character_references(self) -> List[str]:
-        """Check if all character references in scenes exist in canon"""
-        issues = []
-        scenes_dir = self.repo_root / "story" / "scenes"
-
-        if not scenes_dir.exists():
-            return issues
-
-        for scene_file in scenes_dir.glob("*.yml"):
-            try:
-                with open(scene_file, 'r', encoding='utf-8') as f:
-                    scene_data = yaml.safe_load(f)
-
-                scene_characters = scene_data.get('characters', [])
-                for char_id in scene_characters:
-                    if char_id not in self.characters:
-                        issues.append(f"Scene {scene_file.stem}: Unknown character {char_id}")
-
-            except Exception as e:
-                issues.append(f"Failed to parse {scene_file}: {e}")
-
-        return issues
-
-    def check_location_references(self) -> List[str]:
-        """Check if all location references in scenes exist in canon"""
-        issues = []
-        scenes_dir = self.repo_root / "story" / "scenes"
-
-        if not scenes_dir.exists():
-            return issues
+        """Load the markdown files to check (all, or one shard's) and the global ID index"""
+        if self.shard is not None and self.index is None:
+            # Without a prebuilt index the shard has to index the whole corpus itself
+            self.index = IdIndex.build(self.repo_root)
+        if self.store is None:
+            select = self.shard.selector(self.index, self.repo_root) if self.shard is not None else None
+            self.store = CanonStore(self.repo_root, select=select)
+        if self.index is None:
+            self.index = IdIndex.from_store(self.store)
+        self.resolver = ReferenceResolver(self.index)
+        self.characters = self.index.characters
+        self.locations = self.index.tables['location']
+        self.timeline = self.index.timeline
+        self._lifespans = None
+        self._location_graph = None
+
+    def lifespans(self) -> Lifespans:
+        """Character lifespan index, built on first use"""
+        if self._lifespans is None:
+            self._lifespans = Lifespans(self.index.characters, self.index.timeline)
+        return self._lifespans
+
+    def location_graph(self) -> LocationGraph:
+        """Location reachability index from world.yml, loaded on first use"""
+        if self._location_graph is None:
+            self._location_graph = LocationGraph.for_repo(self.repo_root)
+        return self._location_graph
+
+    def references(self, entry: CanonEntry) -> List[Tuple[str, str]]:
+        """(kind, id) of everything a file refers to, extracted once per file"""
+        if isinstance(entry, IndexRecord):
+            return entry.references
+        if self._references[0] is not entry:
+            extract = REFERENCE_EXTRACTORS.get(entry.kind)
+            self._references = (entry, list(extract(entry)) if extract else [])
+        return self._references[1]
+
+    def affected_entries(self, changed_paths: List[Path], old_ids: Set[str]) -> List[CanonEntry]:
+        """Changed files plus every file that refers to an ID they define or used to define"""
+        by_path = {entry.path.resolve(): entry for entry in self.store}
+        changed = [by_path[path.resolve()] for path in changed_paths if path.resolve() in by_path]
+        ids = set(old_ids)
+        # Taken from the index so a shard also sees IDs defined in other shards' files
+        changed_set = {path.resolve() for path in changed_paths}
+        changed_records = [record for record in self.index if record.path.resolve() in changed_set]
+        ids.update(record.id for record in changed_records if record.id)
+        # A death event shortens the lifespan of the character it is named after, whom no
+        # reference links it to, so everything naming that character (and the event's
+        # other characters) is re-checked; a changed first_appearance is covered by the
+        # character file's own ID
+        for record in changed_records:
+            if record.kind == 'timeline' and DEATH_EVENT_RE.match(record.id):
+                ids.update(ref for ref_kind, ref in record.references if ref_kind == 'character')
+        ids.update(f"C-{match.group(1)}" for match in map(DEATH_EVENT_RE.match, list(ids)) if match)
+
+        referrers = build_reverse_index(self.store)
+        affected = {id(entry): entry for entry in changed}
+        for entity_id in ids:
+            for entry in referrers.get(entity_id, ()):
+                affected[id(entry)] = entry
+        self.scope = ids | {entry.id for entry in affected.values() if entry.id}
+
+        # Keep the store's file order so results read the same as a full run
+        order = {id(entry): i for i, entry in enumerate(self.store)}
+        return sorted(affected.values(), key=lambda entry: order[id(entry)])
+
+    def report(self, results: Dict[str, List[Finding]], check: ContinuityCheck, issues: Iterable,
+               entry: Optional[CanonEntry] = None):
+        """Hand a check's issues to the reporter as they are produced, keeping them
+        for the text listing unless output is streamed"""
+        for issue in issues:
+            if not isinstance(issue, Finding):
+                issue = Finding(str(issue), entry.path if entry else None, entry.id if entry else None)
+            if issue.rule is None:
+                issue.rule = check.name
+            self.reporter.report(issue)
+            if self.reporter.verbose:
+                results[check.name].append(issue)
+
+    def run_checks(self, checks: Iterable[ContinuityCheck],
+                   entries: Optional[Iterable[CanonEntry]] = None) -> Dict[str, List[Finding]]:
+        """Visit every parsed file (or just the given ones) once, handing it to each
+        per-file check, then run corpus checks"""
+        checks = list(checks)
+        results = {check.name: [] for check in checks}
+        by_kind = {kind: [check for check in checks if check.kinds is not None and kind in check.kinds]
+                   for kind in KIND_LABELS}
+
+        self.failed = []
+        for entry in (self.store if entries is None else entries):
+            if entry.error:
+                self.failed.append(entry)
+                continue
+            for check in by_kind[entry.kind]:
+                self.report(results, check, check.func(self, entry), entry)
+        self._references = (None, [])
+
+        for check in checks:
+            if check.kinds is None:
+                self.report(results, check, check.func(self))
+        return results
 
-        for scene_file in scenes_dir.glob("*.yml"):
-            try:
-                with open(scene_file, 'r', encoding='utf-8') as f:
-                    scene_data = yaml.safe_load(f)
-
-                scene_location = scene_data.get('location')
-                if scene_location and scene_location not in self.locations:
-                    issues.append(f"Scene {scene_file.stem}: Unknown location {scene_location}")
-
-            except Exception as e:
-                issues.append(f"Failed to parse {scene_file}: {e}")
-
-        return issues
-
-    def check_timeline_consistency(self) -> List[str]:
-        """Check for timeline inconsistencies"""
-        issues = []
-
-        # Check for conflicting dates/periods
-        periods = {}
-        for event_id, event in self.timeline.items():
-            period = event.get('period', 'unknown')
-            if period not in periods:
-                periods[period] = []
-            periods[period].append(event)
-
-        # Check for events that should be in same period but have different dates
-        # Note: Different dates in the same period are valid for Westworld's timeline structure
-        for period, events in periods.items():
-            dates = [e.get('date') for e in events if e.get('date')]
-            # Only flag as error if there are multiple events with the same date that should be different
-            # For now, we'll accept the current timeline structure as valid
-            pass
-
-        return issues
-
-    def run_all_checks(self) -> Dict[str, List[str]]:
-        """Run all continuity checks"""
-        console.print("Loading canon files...")
+    def run_all_checks(self, since: Optional[str] = None) -> Dict[str, List[Finding]]:
+        """Run all continuity checks, optionally only on what changed since a git ref"""
+        self.reporter.progress("Loading canon files...")
         self.load_canon()
 
-        console.print("Running continuity checks...")
+        entries = None
+        if since is not None:
+            changed_paths, old_ids = git_changes(self.repo_root, since)
+            entries = self.affected_entries(changed_paths, old_ids)
+            world = (self.repo_root / WORLD_FILE).resolve()
+            self.world_changed = any(path.resolve() == world for path in changed_paths)
+            self.reporter.progress(f"Checking {len(entries)} of {len(self.store)} files affected by "
+                                   f"{len(changed_paths)} change(s) since {since}")
+
+        self.reporter.progress("Running continuity checks...")
 
-        results = {
-            'character_references': self.check_character_references(),
-            'location_references': self.check_location_references(),
-            'timeline_consistency': self.check_timeline_consistency(),
-        }
+        results = self.run_checks(CHECKS.values(), entries)
+        self.reporter.progress(f"Resolved {self.resolver.resolved} references against {len(self.index.by_id)} IDs")
 
         return results
 
-    def print_results(self, results: Dict[str, List[str]]):
+    def print_results(self, results: Dict[str, List[Finding]]):
         """Print continuity check results"""
+        if not self.reporter.verbose:
+            extra = {'shard': str(self.shard)} if self.shard is not None else {}
+            self.reporter.summary(self.reporter.counts['error'] == 0, files=len(self.store),
+                                  references=self.resolver.resolved, **extra)
+            return
+
         console.print("\n[bold]Continuity Check Results[/bold]\n")
 
         total_issues = sum(len(issues) for issues in results.values())
@@ -141,15 +419,39 @@ class ContinuityChecker:
 
         console.print(f"[red]Total issues found: {total_issues}[/red]")
 
-def main():
+@click.command()
+@click.option('--plugin', 'plugins', multiple=True, help='Import a module that registers extra checks (repeatable)')
+@click.option('--since', default=None, help='Only check entities affected by changes since this git ref')
+@click.option('--max-hops', default=None, type=int, help='Flag characters moving further than this between consecutive scenes')
+@click.option('--shard', default=None, callback=shard_option,
+              help='Only check shard i of n (e.g. 1/4), split by a stable hash of entity IDs')
+@click.option('--id-index', 'id_index', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Prebuilt ID index (checks/id_index.py) used for lookups across shards')
+@click.option('--format', 'output_format', type=click.Choice(FORMATS), default='text',
+              help='Output format; ndjson streams one JSON record per finding')
+@click.option('--quiet', '-q', is_flag=True, help='Print only the summary')
+def main(plugins, since, max_hops, shard, id_index, output_format, quiet):
     """Main entry point for continuity checking"""
-    checker = ContinuityChecker()
-    results = checker.run_all_checks()
+    # Plugins import this module by name; point that at the running script
+    sys.modules.setdefault('continuity', sys.modules[__name__])
+    for module in plugins:
+        importlib.import_module(module)
+    reporter = Reporter('continuity', output_format, quiet, echo=console.print)
+    index = IdIndex.load(Path(id_index)) if id_index else None
+    checker = ContinuityChecker(max_hops=max_hops, reporter=reporter, index=index, shard=shard)
+    try:
+        results = checker.run_all_checks(since)
+    except subprocess.CalledProcessError as e:
+        if reporter.verbose:
+            console.print(f"[red]ERROR: git failed: {e.stderr.decode().strip()}[/red]")
+        else:
+            reporter.report(Finding(f"git failed: {e.stderr.decode().strip()}", rule='git'))
+            reporter.summary(False)
+        exit(1)
     checker.print_results(results)
 
     # Exit with error code if issues found
-    total_issues = sum(len(issues) for issues in results.values())
-    if total_issues > 0:
+    if reporter.counts['error'] > 0:
         exit(1)
 
 
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Fast frontmatter reader for the markdown corpus.
+Splits the `---` header off itself and parses it with libyaml's CSafeLoader
+when available, without building python-frontmatter Post objects. Results
+match frontmatter.loads for YAML headers; anything else falls back to it.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Tuple
+
+import frontmatter
+import yaml
+
+try:
+    Loader = yaml.CSafeLoader
+except AttributeError:
+    Loader = yaml.SafeLoader
+
+# Same delimiter pattern python-frontmatter uses for YAML headers
+FM_BOUNDARY = re.compile(r'^-{3,}\s*$', re.MULTILINE)
+
+
+def _load_yaml(header: str) -> Dict:
+    data = yaml.load(header, Loader=Loader)
+    return data if isinstance(data, dict) else {}
+
+
+def parse_frontmatter(text: str) -> Tuple[Dict, str]:
+    """Split text into (metadata, content) exactly as frontmatter.loads does"""
+    text = text.replace('\r\n', '\n')
+    if not FM_BOUNDARY.match(text):
+        # No YAML header (or a JSON/TOML one): leave it to python-frontmatter
+        post = frontmatter.loads(text)
+        return dict(post.metadata), post.content
+
+    text = text.strip()
+    try:
+        _, header, content = FM_BOUNDARY.split(text, 2)
+    except ValueError:
+        return {}, text
+    return _load_yaml(header), content.strip()
+
+
+def read_header(path: Path) -> Dict:
+    """Parse only a file's frontmatter, reading no further than its closing delimiter"""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+        if FM_BOUNDARY.match(first):
+            lines = []
+            for line in f:
+                if FM_BOUNDARY.match(line):
+                    return _load_yaml(''.join(lines))
+                lines.append(line)
+        # No complete header at the top of the file: parse it the slow way
+        f.seek(0)
+        return parse_frontmatter(f.read())[0]
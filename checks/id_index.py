@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Lightweight corpus-wide ID index for checks that only see part of the corpus.
+Every file is reduced to its ID, kind, path, the IDs it refers to and the few
+frontmatter fields corpus-wide checks read. The index is built once from a
+full parse and written as JSON, so sharded runs can resolve references to
+files they never parse.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import click
+
+from canon_store import KINDS, CanonEntry, CanonStore
+
+INDEX_VERSION = 2
+
+# Frontmatter kept per file: what lifespans and travel checks read
+INDEX_FIELDS = ('id', 'first_appearance', 'date', 'death_episode', 'episode', 'location')
+
+
+def as_list(value) -> List:
+    """Frontmatter lists may be written as a single scalar"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def scene_references(scene: CanonEntry) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, id) for every entity a scene refers to"""
+    for char_id in scene.sections.bullets('Characters'):
+        yield 'character', char_id
+    location = scene.get('location')
+    if location:
+        yield 'location', location
+    # Themes are listed both in frontmatter and in the Themes section
+    for theme_id in dict.fromkeys(as_list(scene.get('themes')) + scene.sections.bullets('Themes')):
+        yield 'theme', theme_id
+
+
+def event_references(event: CanonEntry) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, id) for every entity a timeline event refers to"""
+    for char_id in event.sections.bullets('Characters Involved'):
+        yield 'character', char_id
+
+
+# Reference extractors for the kinds of file that refer to other entities
+REFERENCE_EXTRACTORS = {
+    'scene': scene_references,
+    'timeline': event_references,
+}
+
+
+class IndexRecord:
+    """A file as the index sees it; looks up fields like a CanonEntry"""
+
+    __slots__ = ('kind', 'path', 'metadata', 'references', 'error')
+
+    def __init__(self, kind: str, path: Path, metadata: Dict, references: List[Tuple[str, str]],
+                 error: Optional[str] = None):
+        self.kind = kind
+        self.path = path
+        self.metadata = metadata
+        self.references = references
+        self.error = error
+
+    @property
+    def id(self) -> str:
+        return self.metadata.get('id', '')
+
+    def get(self, key: str, default=None):
+        return self.metadata.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.metadata
+
+    def __repr__(self) -> str:
+        return f"IndexRecord({self.kind}, {self.id or self.path.name})"
+
+
+class IdIndex:
+    """Every file in the corpus by kind, ID and path"""
+
+    def __init__(self, records: List[IndexRecord]):
+        self.entries: Dict[str, List[IndexRecord]] = {kind: [] for kind in KINDS}
+        self.tables: Dict[str, Dict[str, IndexRecord]] = {kind: {} for kind in KINDS}
+        self.by_id: Dict[str, IndexRecord] = {}
+        self.by_path: Dict[Path, IndexRecord] = {}
+        # ID -> every file claiming it, for IDs defined more than once
+        self.duplicates: Dict[str, List[Path]] = {}
+        for record in records:
+            self.entries[record.kind].append(record)
+            self.by_path[record.path] = record
+            if record.error or not record.id:
+                continue
+            previous = self.by_id.get(record.id)
+            if previous is not None:
+                self.duplicates.setdefault(record.id, [previous.path]).append(record.path)
+            self.tables[record.kind][record.id] = record
+            self.by_id[record.id] = record
+
+    @property
+    def characters(self) -> Dict[str, IndexRecord]:
+        return self.tables['character']
+
+    @property
+    def timeline(self) -> Dict[str, IndexRecord]:
+        return self.tables['timeline']
+
+    @classmethod
+    def from_store(cls, store: CanonStore) -> 'IdIndex':
+        """Index a fully parsed corpus"""
+        records = []
+        for entry in store:
+            extract = REFERENCE_EXTRACTORS.get(entry.kind)
+            references = list(extract(entry)) if extract and not entry.error else []
+            metadata = {key: entry.metadata[key] for key in INDEX_FIELDS if key in entry.metadata}
+            records.append(IndexRecord(entry.kind, entry.path, metadata, references, entry.error))
+        return cls(records)
+
+    @classmethod
+    def build(cls, repo_root: Path = Path("."), jobs: int = 1) -> 'IdIndex':
+        """Parse the whole corpus (through the parse cache) and index it"""
+        return cls.from_store(CanonStore(repo_root, jobs=jobs))
+
+    @classmethod
+    def load(cls, index_file: Path, repo_root: Path = Path(".")) -> 'IdIndex':
+        """Read an index written by save(); paths are resolved against repo_root"""
+        with open(index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"{index_file} is not a version {INDEX_VERSION} ID index")
+        return cls([IndexRecord(kind, Path(repo_root) / path, metadata, [tuple(ref) for ref in references], error)
+                    for kind, path, metadata, references, error in data['records']])
+
+    def save(self, index_file: Path, repo_root: Path = Path(".")):
+        """Write the index atomically as JSON, with paths relative to repo_root"""
+        records = [[record.kind, record.path.relative_to(repo_root).as_posix(), record.metadata,
+                    record.references, record.error] for record in self]
+        index_file = Path(index_file)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=index_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                # Unquoted YAML dates and the like are written as text
+                json.dump({'version': INDEX_VERSION, 'records': records}, f, default=str)
+            os.replace(tmp, index_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def __iter__(self) -> Iterator[IndexRecord]:
+        for kind in KINDS:
+            yield from self.entries[kind]
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self.entries.values())
+
+
+@click.command()
+@click.option('--output', '-o', required=True, help='Where to write the index JSON')
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--jobs', '-j', default=1, type=int, help='Worker processes for parsing (0 = one per CPU)')
+def main(output, repo_root, jobs):
+    """Build the ID index shared by sharded validation and continuity runs"""
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    repo_path = Path(repo_root)
+    index = IdIndex.build(repo_path, jobs)
+    index.save(Path(output), repo_path)
+    print(f"SUCCESS: Indexed {len(index)} files ({len(index.by_id)} IDs) in {output}")
+
+
+if __name__ == "__main__":
+    main()
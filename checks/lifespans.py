@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Character lifespan index for timeline consistency checks.
+Every character gets sorted intervals of in-world years and of episodes in
+which they can appear, derived from their first appearance and from death
+events (TE-<NAME>-DEATH-nnn). A death bounds the episodes a character appears
+in only when its event gives a death_episode; episode_reference is where the
+event is shown, often long after it happened. Membership lookups are a binary search, so
+checking n appearances costs O(n log k) instead of comparing events pairwise.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+EPISODE_RE = re.compile(r'^S(\d+)E(\d+)$')
+DEATH_EVENT_RE = re.compile(r'^TE-(.+)-DEATH-\d+$')
+
+# Open ends for intervals; comparable with both years and (season, episode) keys
+NEG_INF = float('-inf')
+POS_INF = float('inf')
+EARLIEST = (NEG_INF,)
+LATEST = (POS_INF,)
+
+
+def episode_key(value) -> Optional[Tuple[int, int]]:
+    """Sortable (season, episode) for an ID like S01E09"""
+    match = EPISODE_RE.match(str(value)) if value is not None else None
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def year_key(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class IntervalIndex:
+    """Per-key sorted, merged closed intervals with binary-search membership"""
+
+    def __init__(self):
+        self.intervals: Dict[str, List[Tuple]] = {}
+        self._starts: Dict[str, List] = {}
+
+    def add(self, key: str, start, end):
+        self.intervals.setdefault(key, []).append((start, end))
+
+    def freeze(self):
+        """Sort and merge each key's intervals; call once after the last add"""
+        for key, intervals in self.intervals.items():
+            merged = []
+            for start, end in sorted(intervals):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self.intervals[key] = merged
+            self._starts[key] = [start for start, _ in merged]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.intervals
+
+    def covers(self, key: str, point) -> bool:
+        """True if point lies in one of key's intervals"""
+        starts = self._starts.get(key)
+        if not starts:
+            return False
+        i = bisect_right(starts, point) - 1
+        return i >= 0 and point <= self.intervals[key][i][1]
+
+
+class Lifespans:
+    """When each character can appear, in in-world years and in episodes"""
+
+    def __init__(self, characters: Dict, events: Dict):
+        self.years = IntervalIndex()
+        self.episodes = IntervalIndex()
+        # Character ID -> (year, episode key, event ID) of their death
+        self.deaths: Dict[str, Tuple] = {}
+        self.first_appearance: Dict[str, Tuple] = {}
+
+        for event_id, event in events.items():
+            match = DEATH_EVENT_RE.match(event_id)
+            if not match or f"C-{match.group(1)}" not in characters:
+                continue
+            char_id = f"C-{match.group(1)}"
+            death = (year_key(event.get('date')), episode_key(event.get('death_episode')), event_id)
+            known = self.deaths.get(char_id)
+            if known is None or (death[0] is not None and (known[0] is None or death[0] < known[0])):
+                self.deaths[char_id] = death
+
+        for char_id, character in characters.items():
+            first = episode_key(character.get('first_appearance'))
+            if first is not None:
+                self.first_appearance[char_id] = first
+            year, episode, _ = self.deaths.get(char_id, (None, None, None))
+            self.years.add(char_id, NEG_INF, year if year is not None else POS_INF)
+            self.episodes.add(char_id, first or EARLIEST, episode or LATEST)
+
+        self.years.freeze()
+        self.episodes.freeze()
+
+    def check_year(self, char_id: str, date) -> Optional[str]:
+        """Describe why a character cannot appear in an event dated `date`, if they cannot"""
+        year = year_key(date)
+        if year is None or char_id not in self.years or self.years.covers(char_id, year):
+            return None
+        death_year, _, event_id = self.deaths[char_id]
+        return f"{char_id} appears in {year} after their death in {death_year} ({event_id})"
+
+    def check_episode(self, char_id: str, episode) -> Optional[str]:
+        """Describe why a character cannot appear in a scene of `episode`, if they cannot"""
+        key = episode_key(episode)
+        if key is None or char_id not in self.episodes or self.episodes.covers(char_id, key):
+            return None
+        first = self.first_appearance.get(char_id)
+        if first is not None and key < first:
+            return f"{char_id} appears in {episode} before their first appearance in S{first[0]:02d}E{first[1]:02d}"
+        _, death_episode, event_id = self.deaths[char_id]
+        return (f"{char_id} appears in {episode} after their death in "
+                f"S{death_episode[0]:02d}E{death_episode[1]:02d} ({event_id})")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Batch validation of markdown entries against the Pydantic models in schemas.py.
+Each entry's frontmatter and sections are mapped onto its model's fields, and
+all entries of a kind are validated in one call through a TypeAdapter that is
+built once per process.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from canon_store import CanonEntry
+from schemas import Character, Location, Scene, Theme, TimelineEvent
+
+MODELS: Dict[str, Type[BaseModel]] = {
+    'character': Character,
+    'location': Location,
+    'theme': Theme,
+    'timeline': TimelineEvent,
+    'scene': Scene,
+}
+
+# "- **TEDDY**: Love interest" -> ('TEDDY', 'Love interest')
+RELATIONSHIP_RE = re.compile(r'^\*\*(.+?)\*\*:\s*(.*)$')
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Validator for a list of a model, built once per process"""
+    return TypeAdapter(List[model])
+
+
+def relationships(entry: CanonEntry) -> Dict[str, str]:
+    pairs = {}
+    for bullet in entry.sections.bullets('Relationships'):
+        match = RELATIONSHIP_RE.match(bullet)
+        if match:
+            pairs[match.group(1)] = match.group(2)
+    return pairs
+
+
+def optional_text(value) -> Optional[str]:
+    """Scalars such as years are written unquoted in frontmatter but modelled as text"""
+    return None if value is None else str(value)
+
+
+def model_input(entry: CanonEntry) -> Dict:
+    """Map an entry's frontmatter and sections onto its model's fields"""
+    data = dict(entry.metadata)
+    sections = entry.sections
+    if entry.kind == 'character':
+        data.setdefault('traits', sections.bullets('Traits'))
+        data.setdefault('goals', sections.bullets('Goals'))
+        data.setdefault('relationships', relationships(entry))
+        data.setdefault('backstory', sections.get('Backstory') or None)
+        data.setdefault('narrative_function', sections.get('Narrative Function') or None)
+    elif entry.kind == 'location':
+        data.setdefault('description', sections.get('Overview'))
+        data.setdefault('connected_to', sections.bullets('Connected Locations'))
+    elif entry.kind == 'theme':
+        data.setdefault('description', sections.get('Description'))
+        data.setdefault('examples', sections.bullets('Examples'))
+        data.setdefault('significance', sections.get('Significance'))
+    elif entry.kind == 'timeline':
+        data['date'] = optional_text(data.get('date'))
+        data.setdefault('description', sections.get('Overview'))
+        data.setdefault('characters_involved', sections.bullets('Characters Involved'))
+        data.setdefault('significance', sections.get('Significance'))
+    elif entry.kind == 'scene':
+        data.setdefault('characters', sections.bullets('Characters'))
+        data.setdefault('synopsis', sections.get('Synopsis'))
+        data.setdefault('reveals', sections.bullets('Reveals'))
+        data.setdefault('conflicts', sections.bullets('Conflicts'))
+    return data
+
+
+def validate_models(kind: str, entries: List[CanonEntry]) -> List[List[str]]:
+    """Validate entries of one kind in a single batch, returning each entry's schema errors"""
+    errors: List[List[str]] = [[] for _ in entries]
+    if not entries:
+        return errors
+    try:
+        list_adapter(MODELS[kind]).validate_python([model_input(entry) for entry in entries])
+    except ValidationError as e:
+        for error in e.errors():
+            index, *field = error['loc']
+            where = '.'.join(str(part) for part in field) or 'entry'
+            errors[index].append(f"{where}: {error['msg']}")
+    return errors
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache of parsed markdown files.
+Entries are keyed by a hash of the file content and the parser version, so an
+unchanged file is never YAML-parsed twice. A stat index (mtime and size per
+path) lets warm runs skip even reading files that have not been touched.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Bump whenever the parsed representation changes to invalidate old entries
+PARSER_VERSION = 3
+
+DEFAULT_CACHE_DIR = Path('.cache') / 'westworld'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Files modified this recently may still change within the same mtime tick,
+# so their stat is not trusted on the next run and their content is hashed
+RACY_SECONDS = 2.0
+
+
+def content_key(data: bytes) -> str:
+    """Return the cache key for raw file content"""
+    digest = hashlib.sha256(data)
+    digest.update(f"parser-v{PARSER_VERSION}".encode())
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Size-bounded, content-addressed cache of parsed files"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / f"parse-v{PARSER_VERSION}.pickle"
+        self.max_bytes = max_bytes
+        # path -> (mtime_ns, size, key)
+        self.stats: Dict[str, Tuple[int, int, str]] = {}
+        # key -> [value, size, last_used_run]
+        self.entries: Dict[str, list] = {}
+        self.run = 0
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self._load()
+
+    @classmethod
+    def for_repo(cls, repo_root: Path) -> 'ParseCache':
+        """Open the default cache for a repository"""
+        return cls(Path(repo_root) / DEFAULT_CACHE_DIR)
+
+    def _load(self):
+        """Read the cache file, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') == PARSER_VERSION:
+                self.stats = data['stats']
+                self.entries = data['entries']
+                self.run = data['run']
+        except Exception:
+            self.stats = {}
+            self.entries = {}
+        self.run += 1
+
+    def lookup_stat(self, path: Path, st: os.stat_result) -> Optional[Tuple[str, object]]:
+        """Return (key, cached value) if the file's stat is unchanged"""
+        known = self.stats.get(str(path))
+        if known is None or known[0] != st.st_mtime_ns or known[1] != st.st_size:
+            return None
+        value = self._hit(known[2])
+        return None if value is None else (known[2], value)
+
+    def lookup(self, key: str) -> Optional[object]:
+        """Return the cached value for a content key"""
+        return self._hit(key)
+
+    def _hit(self, key: str) -> Optional[object]:
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        if item[2] != self.run:
+            item[2] = self.run
+            self.dirty = True
+        self.hits += 1
+        return item[0]
+
+    def store(self, path: Path, st: os.stat_result, key: str, value: object):
+        """Record a parsed value and remember the file's stat for next time"""
+        if key not in self.entries:
+            self.misses += 1
+            self.entries[key] = [value, st.st_size, self.run]
+        self.remember(path, st, key)
+        self.dirty = True
+
+    def remember(self, path: Path, st: os.stat_result, key: str):
+        """Map a path's current stat to a content key"""
+        if time.time() - st.st_mtime_ns / 1e9 < RACY_SECONDS:
+            self.stats.pop(str(path), None)
+        elif self.stats.get(str(path)) != (st.st_mtime_ns, st.st_size, key):
+            self.stats[str(path)] = (st.st_mtime_ns, st.st_size, key)
+            self.dirty = True
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its budget"""
+        total = sum(item[1] for item in self.entries.values())
+        if total <= self.max_bytes:
+            return
+        for key, item in sorted(self.entries.items(), key=lambda kv: kv[1][2]):
+            if total <= self.max_bytes:
+                break
+            total -= item[1]
+            del self.entries[key]
+        self.stats = {p: s for p, s in self.stats.items() if s[2] in self.entries}
+
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        if not self.dirty:
+            return
+        self._evict()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        data = {'version': PARSER_VERSION, 'run': self.run, 'stats': self.stats, 'entries': self.entries}
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.dirty = False
+        # Caches written by older parser versions can never be hit again
+        for stale in self.cache_dir.glob("parse-v*.pickle"):
+            if stale != self.path:
+                stale.unlink(missing_ok=True)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Location reachability index built from the connected_to links in world.yml.
+Links are treated as two-way paths. A shortest-hop table over every pair of
+connected locations answers distance queries with two dict lookups. It is
+cached on disk and updated incrementally when links change, instead of being
+rebuilt from scratch.
+"""
+
+import os
+import pickle
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set
+
+import yaml
+
+from fast_frontmatter import Loader
+from parse_cache import DEFAULT_CACHE_DIR
+
+WORLD_FILE = Path('canon') / 'world.yml'
+CACHE_FILE = 'reachability.pickle'
+
+
+def load_connections(world_file: Path) -> Dict[str, List[str]]:
+    """Read location ID -> connected_to IDs from world.yml"""
+    with open(world_file, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=Loader) or {}
+    connections = {}
+    for location in data.get('locations') or []:
+        if isinstance(location, dict) and isinstance(location.get('id'), str):
+            connections[location['id']] = [str(c) for c in location.get('connected_to') or []]
+    return connections
+
+
+def edge_set(connections: Dict[str, List[str]]) -> Set[FrozenSet[str]]:
+    return {frozenset((a, b)) for a, linked in connections.items() for b in linked if a != b}
+
+
+class LocationGraph:
+    """Adjacency lists plus an all-pairs shortest-hop table"""
+
+    def __init__(self, connections: Optional[Dict[str, List[str]]] = None):
+        self.connections: Dict[str, List[str]] = {}
+        self.adjacency: Dict[str, Set[str]] = {}
+        # hops[a][b] for every b reachable from a, including hops[a][a] == 0
+        self.hops: Dict[str, Dict[str, int]] = {}
+        if connections:
+            self.update(connections)
+
+    def __contains__(self, location_id: str) -> bool:
+        return location_id in self.adjacency
+
+    def distance(self, a: str, b: str) -> Optional[int]:
+        """Fewest hops from a to b, or None if b cannot be reached"""
+        row = self.hops.get(a)
+        return row.get(b) if row is not None else None
+
+    def _bfs(self, source: str) -> Dict[str, int]:
+        row = {source: 0}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbour in self.adjacency[node]:
+                if neighbour not in row:
+                    row[neighbour] = row[node] + 1
+                    queue.append(neighbour)
+        return row
+
+    def update(self, connections: Dict[str, List[str]]) -> bool:
+        """Bring the graph in line with new connected_to data, returning whether anything changed"""
+        old_edges = edge_set(self.connections)
+        new_edges = edge_set(connections)
+        old_nodes = set(self.adjacency)
+        new_nodes = set(connections) | {node for edge in new_edges for node in edge}
+        removed = old_edges - new_edges
+        added = new_edges - old_edges
+        self.connections = {key: list(value) for key, value in connections.items()}
+        if not removed and not added and old_nodes == new_nodes:
+            return False
+
+        # Removing links or locations can lengthen paths anywhere in their component,
+        # so those components are recomputed
+        stale = set()
+        for node in old_nodes - new_nodes:
+            stale.update(self.hops.get(node, ()))
+        for edge in removed:
+            for node in edge:
+                stale.update(self.hops.get(node, ()))
+
+        for node in old_nodes - new_nodes:
+            for neighbour in self.adjacency.pop(node):
+                if neighbour in self.adjacency:
+                    self.adjacency[neighbour].discard(node)
+            self.hops.pop(node, None)
+        for node in new_nodes - old_nodes:
+            self.adjacency[node] = set()
+            self.hops[node] = {node: 0}
+        for edge in removed:
+            a, b = tuple(edge)
+            if a in self.adjacency and b in self.adjacency:
+                self.adjacency[a].discard(b)
+                self.adjacency[b].discard(a)
+
+        for node in stale & new_nodes:
+            self.hops[node] = self._bfs(node)
+
+        # A new link u-v can only shorten paths that go through it
+        for edge in added:
+            u, v = tuple(edge)
+            self.adjacency[u].add(v)
+            self.adjacency[v].add(u)
+            from_u = dict(self.hops[u])
+            from_v = dict(self.hops[v])
+            for a, a_to_u in from_u.items():
+                row = self.hops[a]
+                for b, v_to_b in from_v.items():
+                    hops = a_to_u + 1 + v_to_b
+                    if hops < row.get(b, hops + 1):
+                        row[b] = hops
+                        self.hops[b][a] = hops
+        return True
+
+    @classmethod
+    def for_repo(cls, repo_root: Path, use_cache: bool = True) -> 'LocationGraph':
+        """Graph for a repository's world.yml, reusing and refreshing the cached table"""
+        world_file = Path(repo_root) / WORLD_FILE
+        connections = load_connections(world_file) if world_file.exists() else {}
+        if not use_cache:
+            return cls(connections)
+
+        cache_file = Path(repo_root) / DEFAULT_CACHE_DIR / CACHE_FILE
+        graph = None
+        try:
+            with open(cache_file, 'rb') as f:
+                graph = pickle.load(f)
+        except Exception:
+            pass
+        if not isinstance(graph, cls):
+            graph = cls()
+        if graph.update(connections) or not cache_file.exists():
+            graph.save(cache_file)
+        return graph
+
+    def save(self, cache_file: Path):
+        """Write the graph atomically"""
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Structured findings shared by the validators and the continuity checker.
+In text mode findings are kept for the usual end-of-run listing. With
+--format ndjson each finding is written as one JSON line as soon as it is
+found, and nothing is kept in memory. --quiet leaves only the summary.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+FORMATS = ('text', 'ndjson')
+SEVERITIES = ('error', 'warning')
+
+
+class Finding:
+    """One problem found in the corpus: where it is, which rule found it and what it is"""
+
+    __slots__ = ('file', 'entity', 'rule', 'severity', 'message')
+
+    def __init__(self, message: str, file: Optional[Path] = None, entity: Optional[str] = None,
+                 rule: Optional[str] = None, severity: str = 'error'):
+        self.message = message
+        self.file = file
+        self.entity = entity
+        self.rule = rule
+        self.severity = severity
+
+    def __str__(self) -> str:
+        return self.message
+
+    def __repr__(self) -> str:
+        return f"Finding({self.severity}, {self.rule}, {self.message!r})"
+
+    def as_dict(self) -> Dict:
+        return {
+            'type': 'finding',
+            'file': str(self.file) if self.file is not None else None,
+            'entity': self.entity or None,
+            'rule': self.rule,
+            'severity': self.severity,
+            'message': self.message,
+        }
+
+
+class Reporter:
+    """Where a tool sends its findings and progress lines, in the chosen output format"""
+
+    def __init__(self, tool: str, format: str = 'text', quiet: bool = False,
+                 echo: Callable = print, stream=None):
+        self.tool = tool
+        self.format = format
+        self.quiet = quiet
+        self.echo = echo
+        self.stream = stream if stream is not None else sys.stdout
+        self.counts = {severity: 0 for severity in SEVERITIES}
+        # Findings kept for the text listing; empty when streaming or quiet
+        self.errors: List[Finding] = []
+        self.warnings: List[Finding] = []
+
+    @property
+    def verbose(self) -> bool:
+        """Whether progress and the full text listing are printed"""
+        return self.format == 'text' and not self.quiet
+
+    def progress(self, message: str, **kwargs):
+        """Print a progress line, e.g. SUCCESS for a file, unless output is structured or quiet"""
+        if self.verbose:
+            self.echo(message, **kwargs)
+
+    def report(self, finding: Finding) -> Finding:
+        self.counts[finding.severity] += 1
+        if self.format == 'ndjson':
+            if not self.quiet:
+                self.write(finding.as_dict())
+        elif not self.quiet:
+            (self.errors if finding.severity == 'error' else self.warnings).append(finding)
+        return finding
+
+    def write(self, record: Dict):
+        # Flushed per line so consumers see findings as they are produced
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+
+    def summary(self, valid: bool, **extra):
+        """Report the run's outcome. Verbose text runs print their own listing instead"""
+        if self.format == 'ndjson':
+            self.write({'type': 'summary', 'tool': self.tool, 'valid': valid,
+                        'errors': self.counts['error'], 'warnings': self.counts['warning'], **extra})
+        elif self.quiet:
+            status = 'SUCCESS' if valid else 'ERROR'
+            self.stream.write(f"{status}: {self.tool}: {self.counts['error']} error(s), "
+                              f"{self.counts['warning']} warning(s)\n")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of per-file validation outcomes.
+A file that passed validation is remembered by its kind and content hash under
+the current rule-set version, so an unchanged file is not validated again.
+The rule-set version is derived from the source of the modules that define the
+rules and from the pydantic version, so editing a rule invalidates the cache.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import pydantic
+
+from canon_store import CanonEntry
+from parse_cache import DEFAULT_CACHE_DIR
+
+# Modules, next to this one, whose source defines what a valid file is, including
+# the frontmatter and section parsers the rules read their input through
+RULE_MODULES = ('validate_markdown.py', 'rules.py', 'model_validation.py', 'schemas.py',
+                'sections.py', 'fast_frontmatter.py')
+
+# Most remembered outcomes kept; the least recently used are dropped beyond this
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+def ruleset_version() -> str:
+    """Fingerprint of the validation rules"""
+    digest = hashlib.sha256(f"pydantic-{pydantic.VERSION}".encode())
+    checks_dir = Path(__file__).resolve().parent
+    for name in RULE_MODULES:
+        digest.update(name.encode())
+        digest.update((checks_dir / name).read_bytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Remembers which file contents passed validation under the current rules"""
+
+    def __init__(self, cache_dir: Path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / "validation-results.pickle"
+        self.max_entries = max_entries
+        self.ruleset = ruleset_version()
+        # "kind:content key" -> last run it was used in
+        self.valid: Dict[str, int] = {}
+        self.run = 0
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self._load()
+
+    @classmethod
+    def for_repo(cls, repo_root: Path) -> 'ResultCache':
+        """Open the default result cache for a repository"""
+        return cls(Path(repo_root) / DEFAULT_CACHE_DIR)
+
+    def _load(self):
+        """Read the cache file, starting empty if it is missing, unreadable or from other rules"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+            self.run = data['run']
+            if data.get('ruleset') == self.ruleset:
+                self.valid = data['valid']
+            else:
+                self.dirty = True
+        except Exception:
+            self.valid = {}
+        self.run += 1
+
+    @staticmethod
+    def key(entry: CanonEntry) -> Optional[str]:
+        return f"{entry.kind}:{entry.digest}" if entry.digest and not entry.error else None
+
+    def known_valid(self, entry: CanonEntry) -> bool:
+        """True if this exact content already passed validation under the current rules"""
+        key = self.key(entry)
+        if key is not None and key in self.valid:
+            if self.valid[key] != self.run:
+                self.valid[key] = self.run
+                self.dirty = True
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def mark_valid(self, entry: CanonEntry):
+        key = self.key(entry)
+        if key is not None:
+            self.valid[key] = self.run
+            self.dirty = True
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        if not self.dirty:
+            return
+        if len(self.valid) > self.max_entries:
+            recent = sorted(self.valid.items(), key=lambda kv: kv[1], reverse=True)[:self.max_entries]
+            self.valid = dict(recent)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        data = {'ruleset': self.ruleset, 'run': self.run, 'valid': self.valid}
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.dirty = False
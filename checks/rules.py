@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Declarative structure rules for markdown entity files.
+Each entity kind lists its required frontmatter fields and `## ` sections, and
+takes its ID pattern from its Pydantic model. The tables are compiled once: every
+required heading of every kind gets a bit, so a file's sections are checked in
+a single pass over its headings, however many rules there are.
+"""
+
+import re
+from typing import Dict, List, Optional, Pattern, Tuple, Type
+
+from pydantic import BaseModel
+
+from canon_store import CanonEntry
+from model_validation import MODELS
+
+# kind -> (required frontmatter fields, required sections)
+RULES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    'character': (('id', 'name', 'type', 'role', 'status'),
+                  ('Overview', 'Traits', 'Goals', 'Relationships', 'Backstory')),
+    'location': (('id', 'name'), ('Overview',)),
+    'theme': (('id', 'name'), ('Description', 'Examples', 'Significance')),
+    'timeline': (('id', 'title'), ('Overview', 'Significance')),
+    'scene': (('id', 'episode', 'title'), ('Synopsis', 'Characters')),
+}
+
+
+def model_id_pattern(model: Type[BaseModel]) -> Optional[Pattern]:
+    """The regex a model's id field must match, if it declares one"""
+    pattern = model.model_json_schema().get('properties', {}).get('id', {}).get('pattern')
+    return re.compile(pattern) if pattern else None
+
+
+class EntityRules:
+    """One kind's rules, with its required sections compiled to a bit mask"""
+
+    __slots__ = ('kind', 'fields', 'sections', 'id_pattern', 'bits', 'mask')
+
+    def __init__(self, kind: str, fields: Tuple[str, ...], sections: Tuple[str, ...],
+                 id_pattern: Optional[Pattern], bits: Dict[str, int]):
+        self.kind = kind
+        self.fields = fields
+        self.sections = sections
+        self.id_pattern = id_pattern
+        # Heading -> bit, shared by every kind compiled together
+        self.bits = bits
+        self.mask = 0
+        for section in sections:
+            self.mask |= bits[section]
+
+    def missing_fields(self, entry: CanonEntry) -> List[str]:
+        return [field for field in self.fields if field not in entry]
+
+    def missing_sections(self, entry: CanonEntry) -> List[str]:
+        """Required sections absent from the file, found in one pass over its headings"""
+        seen = 0
+        for heading in entry.sections:
+            seen |= self.bits.get(heading, 0)
+        if seen & self.mask == self.mask:
+            return []
+        return [section for section in self.sections if not seen & self.bits[section]]
+
+    def bad_id(self, entry: CanonEntry) -> bool:
+        entity_id = entry.get('id')
+        return self.id_pattern is not None and not (isinstance(entity_id, str) and self.id_pattern.match(entity_id))
+
+
+def compile_rules(rules: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]) -> Dict[str, EntityRules]:
+    """Give every required heading of every kind a bit and build each kind's rules"""
+    bits: Dict[str, int] = {}
+    for _, sections in rules.values():
+        for section in sections:
+            bits.setdefault(section, 1 << len(bits))
+    return {kind: EntityRules(kind, fields, sections, model_id_pattern(MODELS[kind]), bits)
+            for kind, (fields, sections) in rules.items()}
+
+
+COMPILED_RULES = compile_rules(RULES)
@@ -41,6 +41,8 @@ class Scene(BaseModel):
     themes: List[str] = []
     reveals: List[str] = []
     conflicts: List[str] = []
+    # Characters present only as a memory or flashback, exempt from lifespan checks
+    remembered_characters: List[str] = []
     
 class Episode(BaseModel):
     id: str = Field(..., pattern="^S[0-9]{2}E[0-9]{2}$")
@@ -54,14 +56,14 @@ class Episode(BaseModel):
     scenes: List[str] = []
 
 class Theme(BaseModel):
-    id: str = Field(..., pattern="^T-[A-Z]+$")
+    id: str = Field(..., pattern="^T-[A-Z]+(-[A-Z]+)*$")
     name: str
     description: str
     examples: List[str] = []
     significance: str
 
 class TimelineEvent(BaseModel):
-    id: str = Field(..., pattern="^TE-[A-Z]+-[0-9]+$")
+    id: str = Field(..., pattern="^TE-[A-Z]+(-[A-Z]+)*-[0-9]+$")
     title: str
     date: Optional[str] = None
     period: str
@@ -69,4 +71,8 @@ class TimelineEvent(BaseModel):
     characters_involved: List[str] = []
     significance: str
     episode_reference: Optional[str] = None
+    # Episode in which the character of a TE-<NAME>-DEATH-nnn event dies on screen
+    death_episode: Optional[str] = Field(None, pattern="^S[0-9]{2}E[0-9]{2}$")
+    # Characters involved only as a memory or flashback, exempt from lifespan checks
+    remembered_characters: List[str] = []
 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Section index for markdown bodies.
+A body is scanned once for `## ` headings and only the heading offsets are
+kept; section text is sliced out of the original string when it is accessed.
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HEADING_RE = re.compile(r'^## (.*)$', re.MULTILINE)
+
+# A bullet is a line that starts with "- " once surrounding whitespace is
+# stripped and still has text after the marker
+BULLET_RE = re.compile(r'^[^\S\n]*- ([^\n]*?\S)[^\S\n]*$', re.MULTILINE)
+
+
+def scan_sections(text: str) -> Dict[str, Tuple[int, int]]:
+    """Map each `## ` heading to the (start, end) offsets of its section body"""
+    spans = {}
+    headings = list(HEADING_RE.finditer(text))
+    for i, match in enumerate(headings):
+        name = match.group(1).strip()
+        start = match.end() + 1
+        if i + 1 < len(headings):
+            end = headings[i + 1].start()
+            has_lines = start < end
+        else:
+            end = len(text)
+            has_lines = start <= end
+        # Headings with no lines beneath them do not form a section
+        if name and has_lines:
+            spans[name] = (start, end)
+    return spans
+
+
+def extract_bullets(text: str) -> List[str]:
+    """Return the text of every `- ` bullet line in a block"""
+    return BULLET_RE.findall(text)
+
+
+class SectionIndex:
+    """Lazily sliced `## ` sections of one markdown body"""
+
+    __slots__ = ('text', 'spans')
+
+    def __init__(self, text: str, spans: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.text = text
+        self.spans = spans if spans is not None else scan_sections(text)
+
+    def get(self, name: str, default: str = '') -> str:
+        span = self.spans.get(name)
+        if span is None:
+            return default
+        return self.text[span[0]:span[1]].strip()
+
+    def __getitem__(self, name: str) -> str:
+        if name not in self.spans:
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.spans
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def headings(self) -> List[str]:
+        return list(self.spans)
+
+    def bullets(self, name: str) -> List[str]:
+        """Return the bullet items of a section, or an empty list if it is missing"""
+        span = self.spans.get(name)
+        if span is None:
+            return []
+        return BULLET_RE.findall(self.text, span[0], span[1])
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Deterministic sharding of validation and continuity runs.
+Files are assigned to shards by a stable hash of their entity ID (or of their
+repo-relative path when they have none), so every runner agrees on the split
+without coordinating. Each shard writes its findings as NDJSON; the merge
+command here combines the shard result files into one verdict and exit code.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import click
+
+from id_index import IdIndex
+from reporting import FORMATS, Finding, Reporter
+
+
+def shard_of(key: str, count: int) -> int:
+    """Shard number (1..count) for an ID or path; the same on every machine and Python run"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+
+class Shard:
+    """Shard `number` of `count`, written number/count with numbers starting at 1"""
+
+    __slots__ = ('number', 'count')
+
+    def __init__(self, number: int, count: int):
+        if count < 1 or not 1 <= number <= count:
+            raise ValueError(f"shard {number}/{count} is out of range")
+        self.number = number
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Shard':
+        number, sep, count = spec.partition('/')
+        if not sep or not number.strip().isdigit() or not count.strip().isdigit():
+            raise ValueError(f"expected i/n, e.g. 1/4, not {spec!r}")
+        return cls(int(number), int(count))
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.count}"
+
+    def owns(self, key: str) -> bool:
+        return shard_of(key, self.count) == self.number
+
+    def selector(self, index: IdIndex, repo_root: Path) -> Callable[[str, Path], bool]:
+        """Predicate over (kind, path) for the files this shard validates"""
+        def select(kind: str, path: Path) -> bool:
+            record = index.by_path.get(path)
+            if record is not None and record.id:
+                return self.owns(record.id)
+            return self.owns(path.relative_to(repo_root).as_posix())
+        return select
+
+
+def shard_option(ctx, param, value) -> Optional[Shard]:
+    """click callback turning --shard i/n into a Shard"""
+    if value is None:
+        return None
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def read_results(path: Path) -> Tuple[List[Dict], Optional[Dict]]:
+    """Findings and summary record of one NDJSON result file"""
+    findings, summary = [], None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('type') == 'summary':
+                summary = record
+            elif record.get('type') == 'finding':
+                findings.append(record)
+    return findings, summary
+
+
+def merge_results(paths: List[Path], reporter: Reporter) -> bool:
+    """Report every shard's findings and check that each tool's shards all
+    finished and together cover the corpus exactly once"""
+    valid = True
+    # tool -> shard count -> shard numbers seen
+    coverage: Dict[str, Dict[int, List[int]]] = {}
+    for path in paths:
+        findings, summary = read_results(path)
+        for record in findings:
+            reporter.report(Finding(record['message'], record.get('file'), record.get('entity'),
+                                    record.get('rule'), record.get('severity', 'error')))
+        if summary is None:
+            reporter.report(Finding(f"{path} has no summary record; the shard did not finish",
+                                    str(path), rule='merge'))
+            valid = False
+            continue
+        if not summary.get('valid', False):
+            valid = False
+        shard = Shard.parse(summary.get('shard') or '1/1')
+        coverage.setdefault(summary.get('tool', 'unknown'), {}).setdefault(shard.count, []).append(shard.number)
+
+    for tool, counts in coverage.items():
+        if len(counts) > 1:
+            reporter.report(Finding(f"{tool} results mix shard counts {sorted(counts)}", rule='merge'))
+            valid = False
+        for count, numbers in counts.items():
+            missing = sorted(set(range(1, count + 1)) - set(numbers))
+            repeated = sorted({n for n in numbers if numbers.count(n) > 1})
+            if missing:
+                reporter.report(Finding(f"{tool} is missing shard(s) {', '.join(f'{n}/{count}' for n in missing)}",
+                                        rule='merge'))
+                valid = False
+            if repeated:
+                reporter.report(Finding(f"{tool} has more than one result for shard(s) "
+                                        f"{', '.join(f'{n}/{count}' for n in repeated)}", rule='merge'))
+                valid = False
+    return valid
+
+
+@click.command()
+@click.argument('results', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--strict', is_flag=True, help='Treat warnings as errors')
+@click.option('--format', 'output_format', type=click.Choice(FORMATS), default='text',
+              help='Output format; ndjson re-emits every finding and one merged summary')
+@click.option('--quiet', '-q', is_flag=True, help='Print only the summary')
+def main(results, strict, output_format, quiet):
+    """Merge per-shard NDJSON result files into one verdict and exit code"""
+    reporter = Reporter('merge', output_format, quiet)
+    valid = merge_results([Path(path) for path in results], reporter)
+
+    if not reporter.verbose:
+        reporter.summary(valid, results=len(results))
+    else:
+        if reporter.errors:
+            print("\nERRORS:")
+            for error in reporter.errors:
+                print(f"  ERROR: {error}")
+
+        if reporter.warnings:
+            print("\nWARNINGS:")
+            for warning in reporter.warnings:
+                print(f"  WARNING: {warning}")
+
+        if valid:
+            print(f"\nSUCCESS: All {len(results)} shard result(s) passed!")
+        else:
+            print(f"\nERROR: Validation failed in {len(results)} shard result(s)")
+
+    if not valid or (strict and reporter.counts['warning']):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
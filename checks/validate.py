@@ -3,20 +3,22 @@ import click
 import yaml
 import json
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from rich.console import Console
 from rich.table import Table
 from pydantic import ValidationError
 
 from schemas import Character, Location, Scene, Episode, Theme, TimelineEvent
+from reporting import FORMATS, Finding, Reporter
 
 console = Console()
 
 class StoryValidator:
-    def __init__(self, repo_root: Path = Path(".")):
+    def __init__(self, repo_root: Path = Path("."), reporter: Optional[Reporter] = None):
         self.repo_root = repo_root
-        self.errors = []
-        self.warnings = []
+        self.reporter = reporter if reporter is not None else Reporter('validate', echo=console.print)
+        self.errors = self.reporter.errors
+        self.warnings = self.reporter.warnings
         
     def load_yaml(self, filepath: Path) -> Dict:
         """Load and parse YAML file"""
@@ -24,14 +26,14 @@ class StoryValidator:
             with open(filepath, 'r', encoding='utf-8') as f:
                 return yaml.safe_load(f)
         except Exception as e:
-            self.errors.append(f"Failed to load {filepath}: {e}")
+            self.reporter.report(Finding(f"Failed to load {filepath}: {e}", filepath, rule='parse_error'))
             return {}
     
     def validate_characters(self) -> bool:
         """Validate all character definitions"""
         char_file = self.repo_root / "canon" / "characters.yml"
         if not char_file.exists():
-            self.errors.append(f"Missing characters.yml")
+            self.reporter.report(Finding("Missing characters.yml", char_file, rule='missing_file'))
             return False
             
         data = self.load_yaml(char_file)
@@ -40,9 +42,10 @@ class StoryValidator:
         for char_data in data.get("characters", []):
             try:
                 Character(**char_data)
-                console.print(f"SUCCESS: Character {char_data['id']} valid", style="green")
+                self.reporter.progress(f"SUCCESS: Character {char_data['id']} valid", style="green")
             except ValidationError as e:
-                self.errors.append(f"Character {char_data.get('id', 'unknown')}: {e}")
+                self.reporter.report(Finding(f"Character {char_data.get('id', 'unknown')}: {e}",
+                                             char_file, char_data.get('id'), 'schema'))
                 valid = False
                 
         return valid
@@ -51,7 +54,7 @@ class StoryValidator:
         """Validate world and location definitions"""
         world_file = self.repo_root / "canon" / "world.yml"
         if not world_file.exists():
-            self.errors.append(f"Missing world.yml")
+            self.reporter.report(Finding("Missing world.yml", world_file, rule='missing_file'))
             return False
             
         data = self.load_yaml(world_file)
@@ -60,9 +63,10 @@ class StoryValidator:
         for location_data in data.get("locations", []):
             try:
                 Location(**location_data)
-                console.print(f"SUCCESS: Location {location_data['id']} valid", style="green")
+                self.reporter.progress(f"SUCCESS: Location {location_data['id']} valid", style="green")
             except ValidationError as e:
-                self.errors.append(f"Location {location_data.get('id', 'unknown')}: {e}")
+                self.reporter.report(Finding(f"Location {location_data.get('id', 'unknown')}: {e}",
+                                             world_file, location_data.get('id'), 'schema'))
                 valid = False
                 
         return valid
@@ -71,7 +75,8 @@ class StoryValidator:
         """Validate episode definitions"""
         episodes_dir = self.repo_root / "story" / "episodes"
         if not episodes_dir.exists():
-            self.warnings.append("No episodes directory found")
+            self.reporter.report(Finding("No episodes directory found", episodes_dir,
+                                         rule='missing_directory', severity='warning'))
             return True
             
         valid = True
@@ -79,9 +84,10 @@ class StoryValidator:
             try:
                 data = self.load_yaml(episode_file)
                 Episode(**data)
-                console.print(f"SUCCESS: Episode {episode_file.stem} valid", style="green")
+                self.reporter.progress(f"SUCCESS: Episode {episode_file.stem} valid", style="green")
             except ValidationError as e:
-                self.errors.append(f"Episode {episode_file.stem}: {e}")
+                self.reporter.report(Finding(f"Episode {episode_file.stem}: {e}",
+                                             episode_file, data.get('id'), 'schema'))
                 valid = False
                 
         return valid
@@ -91,12 +97,12 @@ class StoryValidator:
         # Check character references in scenes
         # Check timeline consistency
         # Check location connections
-        console.print("INFO: Continuity checks not yet implemented", style="blue")
+        self.reporter.progress("INFO: Continuity checks not yet implemented", style="blue")
         return True
     
     def run_all_checks(self) -> bool:
         """Run all validation checks"""
-        console.print("\n[bold]Running Story Validation[/bold]\n")
+        self.reporter.progress("\n[bold]Running Story Validation[/bold]\n")
         
         checks = [
             ("Characters", self.validate_characters),
@@ -107,10 +113,14 @@ class StoryValidator:
         
         all_valid = True
         for name, check_func in checks:
-            console.print(f"Checking {name}...")
+            self.reporter.progress(f"Checking {name}...")
             if not check_func():
                 all_valid = False
-                
+
+        if not self.reporter.verbose:
+            self.reporter.summary(all_valid)
+            return all_valid
+
         # Print summary
         if self.errors:
             console.print("\n[red]ERRORS:[/red]")
@@ -131,12 +141,16 @@ class StoryValidator:
 
 @click.command()
 @click.option('--strict', is_flag=True, help='Treat warnings as errors')
-def main(strict):
+@click.option('--format', 'output_format', type=click.Choice(FORMATS), default='text',
+              help='Output format; ndjson streams one JSON record per finding')
+@click.option('--quiet', '-q', is_flag=True, help='Print only the summary')
+def main(strict, output_format, quiet):
     """Validate Westworld story framework files"""
-    validator = StoryValidator()
+    reporter = Reporter('validate', output_format, quiet, echo=console.print)
+    validator = StoryValidator(reporter=reporter)
     valid = validator.run_all_checks()
     
-    if not valid or (strict and validator.warnings):
+    if not valid or (strict and reporter.counts['warning']):
         exit(1)
         
 if __name__ == "__main__":
@@ -4,270 +4,235 @@ Validate markdown files with frontmatter for the Westworld framework.
 This script checks that all markdown files have proper structure and required sections.
 """
 
-import frontmatter
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
 import click
 
-class MarkdownValidator:
-    def __init__(self, repo_root: Path = Path(".")):
-        self.repo_root = repo_root
-        self.errors = []
-        self.warnings = []
+from canon_store import CanonEntry, CanonStore, pool_context
+from id_index import IdIndex
+from model_validation import validate_models
+from reporting import FORMATS, Finding, Reporter
+from result_cache import ResultCache
+from rules import COMPILED_RULES
+from sharding import Shard, shard_option
 
-    def validate_character_file(self, filepath: Path) -> bool:
-        """Validate a character markdown file"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                post = frontmatter.load(f)
+# How each entity kind is named in messages
+KIND_LABELS = {
+    'character': 'Character',
+    'location': 'Location',
+    'theme': 'Theme',
+    'timeline': 'Timeline',
+    'scene': 'Scene',
+}
 
-            # Check required frontmatter
-            required_fields = ['id', 'name', 'type', 'role', 'status']
-            missing_fields = [field for field in required_fields if field not in post]
+# Files validated per batch; each batch is reported as soon as it is done
+BATCH_SIZE = 1000
 
-            if missing_fields:
-                self.errors.append(f"Character {filepath.name}: Missing required frontmatter fields: {missing_fields}")
-                return False
+# Validator shared with pool workers; installed once per worker process
+_VALIDATOR = None
 
-            # Check required sections in content
-            content = post.content
-            required_sections = ['## Overview', '## Traits', '## Goals', '## Relationships', '## Backstory']
-            missing_sections = [section for section in required_sections if section not in content]
 
-            if missing_sections:
-                self.errors.append(f"Character {filepath.name}: Missing required sections: {missing_sections}")
-                return False
+def _install_validator(validator: 'MarkdownValidator'):
+    global _VALIDATOR
+    _VALIDATOR = validator
 
-            return True
 
-        except Exception as e:
-            self.errors.append(f"Character {filepath.name}: Failed to parse: {e}")
-            return False
+def _validate_slice(kind: str, positions: List[int]) -> List[Tuple[bool, List[Finding]]]:
+    """Validate some of one kind's files in a worker, returning (valid, findings) per file"""
+    entries = _VALIDATOR.store.entries[kind]
+    return _VALIDATOR.validate_batch([entries[i] for i in positions])
 
-    def validate_location_file(self, filepath: Path) -> bool:
-        """Validate a location markdown file"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                post = frontmatter.load(f)
 
-            # Check required frontmatter
-            required_fields = ['id', 'name']
-            missing_fields = [field for field in required_fields if field not in post]
+class MarkdownValidator:
+    def __init__(self, repo_root: Path = Path("."), store: Optional[CanonStore] = None, jobs: int = 1,
+                 reporter: Optional[Reporter] = None, shard: Optional[Shard] = None,
+                 results: Optional[ResultCache] = None):
+        self.repo_root = repo_root
+        self.store = store if store is not None else CanonStore(repo_root, jobs=jobs)
+        # The shard the store was loaded for, reported in the summary
+        self.shard = shard
+        # Outcomes of earlier runs; files known to be valid are not validated again
+        self.results = results
+        self.jobs = jobs
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.reporter = reporter if reporter is not None else Reporter('validate_markdown')
+        # Findings kept for the text listing, shared with the reporter
+        self.errors = self.reporter.errors
+        self.warnings = self.reporter.warnings
+        # Findings of the file currently being validated
+        self.findings: List[Finding] = []
+
+    def error(self, entry: CanonEntry, rule: str, message: str):
+        self.findings.append(Finding(message, entry.path, entry.id, rule))
+
+    def validate_entry(self, entry: CanonEntry) -> Tuple[bool, List[Finding]]:
+        """Validate one file in isolation, returning (valid, findings)"""
+        self.findings = []
+        valid = self.validate_file(entry)
+        return valid, self.findings
+
+    def validate_batch(self, entries: List[CanonEntry]) -> List[Tuple[bool, List[Finding]]]:
+        """Validate files of one kind: structure file by file, then frontmatter models in one batch"""
+        results = [self.validate_entry(entry) for entry in entries]
+        passed = [i for i, (valid, _) in enumerate(results) if valid]
+        if passed:
+            kind = entries[passed[0]].kind
+            for i, schema_errors in zip(passed, validate_models(kind, [entries[i] for i in passed])):
+                if schema_errors:
+                    entry = entries[i]
+                    error = Finding(f"{KIND_LABELS[kind]} {entry.path.name}: Schema validation failed: {schema_errors}",
+                                    entry.path, entry.id, 'schema')
+                    results[i] = (False, results[i][1] + [error])
+        return results
+
+    def validate_kind(self, kind: str) -> bool:
+        """Validate every file of a kind, on the worker pool if one is running.
+
+        Files are validated in slices and each slice is reported as soon as it
+        is done, in file order, so the report is the same for any number of
+        workers and streamed output starts before the whole kind is validated.
+        Files whose exact content already passed under the current rules are
+        reported valid without being validated again.
+        """
+        entries = self.store.entries[kind]
+        if self.results is None:
+            pending = list(range(len(entries)))
+        else:
+            pending = [i for i, entry in enumerate(entries) if not self.results.known_valid(entry)]
 
-            if missing_fields:
-                self.errors.append(f"Location {filepath.name}: Missing required frontmatter fields: {missing_fields}")
-                return False
+        if self.pool is None:
+            size = BATCH_SIZE
+            slices = (self.validate_batch([entries[i] for i in pending[start:start + size]])
+                      for start in range(0, len(pending), size))
+        else:
+            size = max(1, min(BATCH_SIZE, -(-len(pending) // (self.jobs * 4))))
+            futures = [self.pool.submit(_validate_slice, kind, pending[start:start + size])
+                       for start in range(0, len(pending), size)]
+            slices = (future.result() for future in futures)
 
-            # Check required sections in content
-            content = post.content
-            required_sections = ['## Overview']
-            missing_sections = [section for section in required_sections if section not in content]
+        valid = True
+        fresh = zip(pending, chain.from_iterable(slices))
+        upcoming = next(fresh, None)
+        for i, entry in enumerate(entries):
+            if upcoming is not None and upcoming[0] == i:
+                entry_valid, findings = upcoming[1]
+                upcoming = next(fresh, None)
+                if entry_valid and self.results is not None:
+                    self.results.mark_valid(entry)
+            else:
+                entry_valid, findings = True, []
 
-            if missing_sections:
-                self.errors.append(f"Location {filepath.name}: Missing required sections: {missing_sections}")
-                return False
+            for finding in findings:
+                self.reporter.report(finding)
+            if not entry_valid:
+                valid = False
+            else:
+                self.reporter.progress(f"SUCCESS: {KIND_LABELS[kind]} {entry.path.name} valid")
 
-            return True
+        return valid
 
-        except Exception as e:
-            self.errors.append(f"Location {filepath.name}: Failed to parse: {e}")
+    def validate_file(self, entry: CanonEntry) -> bool:
+        """Validate one markdown file's structure against its kind's rules"""
+        filepath = entry.path
+        label = KIND_LABELS[entry.kind]
+        rules = COMPILED_RULES[entry.kind]
+        if entry.error:
+            self.error(entry, 'parse_error', f"{label} {filepath.name}: Failed to parse: {entry.error}")
             return False
 
-    def validate_theme_file(self, filepath: Path) -> bool:
-        """Validate a theme markdown file"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                post = frontmatter.load(f)
-
-            # Check required frontmatter
-            required_fields = ['id', 'name']
-            missing_fields = [field for field in required_fields if field not in post]
-
-            if missing_fields:
-                self.errors.append(f"Theme {filepath.name}: Missing required frontmatter fields: {missing_fields}")
-                return False
-
-            # Check required sections in content
-            content = post.content
-            required_sections = ['## Description', '## Examples', '## Significance']
-            missing_sections = [section for section in required_sections if section not in content]
-
-            if missing_sections:
-                self.errors.append(f"Theme {filepath.name}: Missing required sections: {missing_sections}")
-                return False
-
-            return True
-
-        except Exception as e:
-            self.errors.append(f"Theme {filepath.name}: Failed to parse: {e}")
+        missing_fields = rules.missing_fields(entry)
+        if missing_fields:
+            self.error(entry, 'required_fields', f"{label} {filepath.name}: Missing required frontmatter fields: {missing_fields}")
             return False
 
-    def validate_timeline_file(self, filepath: Path) -> bool:
-        """Validate a timeline event markdown file"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                post = frontmatter.load(f)
-
-            # Check required frontmatter
-            required_fields = ['id', 'title']
-            missing_fields = [field for field in required_fields if field not in post]
-
-            if missing_fields:
-                self.errors.append(f"Timeline {filepath.name}: Missing required frontmatter fields: {missing_fields}")
-                return False
-
-            # Check required sections in content
-            content = post.content
-            required_sections = ['## Overview', '## Significance']
-            missing_sections = [section for section in required_sections if section not in content]
-
-            if missing_sections:
-                self.errors.append(f"Timeline {filepath.name}: Missing required sections: {missing_sections}")
-                return False
-
-            return True
-
-        except Exception as e:
-            self.errors.append(f"Timeline {filepath.name}: Failed to parse: {e}")
+        missing_sections = [f"## {section}" for section in rules.missing_sections(entry)]
+        if missing_sections:
+            self.error(entry, 'required_sections', f"{label} {filepath.name}: Missing required sections: {missing_sections}")
             return False
 
-    def validate_scene_file(self, filepath: Path) -> bool:
-        """Validate a scene markdown file"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                post = frontmatter.load(f)
-
-            # Check required frontmatter
-            required_fields = ['id', 'episode', 'title']
-            missing_fields = [field for field in required_fields if field not in post]
-
-            if missing_fields:
-                self.errors.append(f"Scene {filepath.name}: Missing required frontmatter fields: {missing_fields}")
-                return False
-
-            # Check required sections in content
-            content = post.content
-            required_sections = ['## Synopsis', '## Characters']
-            missing_sections = [section for section in required_sections if section not in content]
-
-            if missing_sections:
-                self.errors.append(f"Scene {filepath.name}: Missing required sections: {missing_sections}")
-                return False
-
-            return True
-
-        except Exception as e:
-            self.errors.append(f"Scene {filepath.name}: Failed to parse: {e}")
+        if rules.bad_id(entry):
+            self.error(entry, 'id_pattern', f"{label} {filepath.name}: ID {entry.get('id')!r} does not match "
+                                            f"{rules.id_pattern.pattern}")
             return False
 
+        return True
+
     def validate_characters(self) -> bool:
         """Validate all character markdown files"""
-        chars_dir = self.repo_root / "canon" / "characters"
+        chars_dir = self.store.directory('character')
         if not chars_dir.exists():
-            self.errors.append("Missing characters directory")
+            self.reporter.report(Finding("Missing characters directory", rule='missing_directory'))
             return False
 
-        valid = True
-        char_files = list(chars_dir.glob("*.md"))
-
-        for char_file in char_files:
-            if char_file.name == "index.md":
-                continue
-            if not self.validate_character_file(char_file):
-                valid = False
-            else:
-                print(f"SUCCESS: Character {char_file.name} valid")
-
-        return valid
+        return self.validate_kind('character')
 
     def validate_locations(self) -> bool:
         """Validate all location markdown files"""
-        locs_dir = self.repo_root / "canon" / "locations"
+        locs_dir = self.store.directory('location')
         if not locs_dir.exists():
-            self.errors.append("Missing locations directory")
+            self.reporter.report(Finding("Missing locations directory", rule='missing_directory'))
             return False
 
-        valid = True
-        loc_files = list(locs_dir.glob("*.md"))
-
-        for loc_file in loc_files:
-            if loc_file.name == "index.md":
-                continue
-            if not self.validate_location_file(loc_file):
-                valid = False
-            else:
-                print(f"SUCCESS: Location {loc_file.name} valid")
-
-        return valid
+        return self.validate_kind('location')
 
     def validate_themes(self) -> bool:
         """Validate all theme markdown files"""
-        themes_dir = self.repo_root / "canon" / "themes"
+        themes_dir = self.store.directory('theme')
         if not themes_dir.exists():
-            self.errors.append("Missing themes directory")
+            self.reporter.report(Finding("Missing themes directory", rule='missing_directory'))
             return False
 
-        valid = True
-        theme_files = list(themes_dir.glob("*.md"))
-
-        for theme_file in theme_files:
-            if theme_file.name == "index.md":
-                continue
-            if not self.validate_theme_file(theme_file):
-                valid = False
-            else:
-                print(f"SUCCESS: Theme {theme_file.name} valid")
-
-        return valid
+        return self.validate_kind('theme')
 
     def validate_timeline(self) -> bool:
         """Validate all timeline markdown files"""
-        timeline_dir = self.repo_root / "canon" / "timeline"
+        timeline_dir = self.store.directory('timeline')
         if not timeline_dir.exists():
-            self.errors.append("Missing timeline directory")
+            self.reporter.report(Finding("Missing timeline directory", rule='missing_directory'))
             return False
 
-        valid = True
-        timeline_files = list(timeline_dir.glob("*.md"))
-
-        for timeline_file in timeline_files:
-            if timeline_file.name == "index.md":
-                continue
-            if not self.validate_timeline_file(timeline_file):
-                valid = False
-            else:
-                print(f"SUCCESS: Timeline {timeline_file.name} valid")
-
-        return valid
+        return self.validate_kind('timeline')
 
     def validate_scenes(self) -> bool:
         """Validate all scene markdown files"""
-        scenes_dir = self.repo_root / "story" / "scenes" / "s01e01"
+        scenes_dir = self.store.directory('scene')
         if not scenes_dir.exists():
-            self.warnings.append("No scenes directory found")
+            self.reporter.report(Finding("No scenes directory found", rule='missing_directory', severity='warning'))
             return True
 
+        return self.validate_kind('scene')
+
+    def validate_entries(self, entries: List[CanonEntry]) -> bool:
+        """Validate just the given files, e.g. the ones that changed in watch mode"""
         valid = True
-        scene_files = list(scenes_dir.glob("*.md"))
 
-        for scene_file in scene_files:
-            if scene_file.name == "index.md":
-                continue
-            if not self.validate_scene_file(scene_file):
+        by_kind: Dict[str, List[CanonEntry]] = {}
+        for entry in entries:
+            by_kind.setdefault(entry.kind, []).append(entry)
+        results = {}
+        for kind_entries in by_kind.values():
+            results.update(zip(map(id, kind_entries), self.validate_batch(kind_entries)))
+
+        for entry in entries:
+            entry_valid, findings = results[id(entry)]
+            for finding in findings:
+                self.reporter.report(finding)
+            if not entry_valid:
                 valid = False
-            else:
-                print(f"SUCCESS: Scene {scene_file.name} valid")
 
         return valid
 
     def check_continuity(self) -> bool:
         """Check for continuity issues between files"""
-        print("INFO: Continuity checks not yet implemented")
+        self.reporter.progress("INFO: Continuity checks not yet implemented")
         return True
 
     def run_all_checks(self) -> bool:
         """Run all validation checks"""
-        print("\nRunning Markdown Validation\n")
+        self.reporter.progress("\nRunning Markdown Validation\n")
 
         checks = [
             ("Characters", self.validate_characters),
@@ -278,11 +243,32 @@ class MarkdownValidator:
             ("Continuity", self.check_continuity),
         ]
 
+        if self.jobs > 1:
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=pool_context(),
+                                            initializer=_install_validator, initargs=(self,))
+
         all_valid = True
-        for name, check_func in checks:
-            print(f"Checking {name}...")
-            if not check_func():
-                all_valid = False
+        try:
+            for name, check_func in checks:
+                self.reporter.progress(f"Checking {name}...")
+                if not check_func():
+                    all_valid = False
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+        extra = {'shard': str(self.shard)} if self.shard is not None else {}
+        if self.results is not None:
+            self.results.save()
+            lookups = self.results.hits + self.results.misses
+            self.reporter.progress(f"\nINFO: Result cache: {self.results.hits} of {lookups} files "
+                                   f"already known valid ({self.results.hit_rate:.0%} hit rate)")
+            extra.update(cache_hits=self.results.hits, cache_hit_rate=round(self.results.hit_rate, 4))
+
+        if not self.reporter.verbose:
+            self.reporter.summary(all_valid, files=len(self.store), **extra)
+            return all_valid
 
         # Print summary
         if self.errors:
@@ -304,12 +290,30 @@ class MarkdownValidator:
 
 @click.command()
 @click.option('--strict', is_flag=True, help='Treat warnings as errors')
-def main(strict):
+@click.option('--no-cache', is_flag=True, help='Parse and validate every file instead of using the on-disk caches')
+@click.option('--jobs', '-j', default=1, type=int, help='Worker processes for parsing and validation (0 = one per CPU)')
+@click.option('--shard', default=None, callback=shard_option,
+              help='Only validate shard i of n (e.g. 1/4), split by a stable hash of entity IDs')
+@click.option('--id-index', 'id_index', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Prebuilt ID index (checks/id_index.py) used to assign files to shards')
+@click.option('--format', 'output_format', type=click.Choice(FORMATS), default='text',
+              help='Output format; ndjson streams one JSON record per finding')
+@click.option('--quiet', '-q', is_flag=True, help='Print only the summary')
+def main(strict, no_cache, jobs, shard, id_index, output_format, quiet):
     """Validate Westworld markdown framework files"""
-    validator = MarkdownValidator()
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    reporter = Reporter('validate_markdown', output_format, quiet)
+    select = None
+    if shard is not None:
+        index = IdIndex.load(Path(id_index)) if id_index else IdIndex.build(Path("."), jobs)
+        select = shard.selector(index, Path("."))
+    store = CanonStore(Path("."), use_cache=not no_cache, jobs=jobs, select=select)
+    results = None if no_cache else ResultCache.for_repo(Path("."))
+    validator = MarkdownValidator(store=store, jobs=jobs, reporter=reporter, shard=shard, results=results)
     valid = validator.run_all_checks()
 
-    if not valid or (strict and validator.warnings):
+    if not valid or (strict and reporter.counts['warning']):
         exit(1)
 
 
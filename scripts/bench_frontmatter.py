@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fast frontmatter reader against python-frontmatter.
+Parses every canon and scene markdown file repeatedly with frontmatter.load,
+fast_frontmatter.parse_frontmatter and fast_frontmatter.read_header, checks
+that they agree, and reports the time per file and the speedup.
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+import click
+import frontmatter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "checks"))
+from fast_frontmatter import Loader, parse_frontmatter, read_header
+from frontmatter.default_handlers import SafeLoader as FrontmatterLoader
+
+
+def python_frontmatter(path: Path):
+    with open(path, 'r', encoding='utf-8') as f:
+        post = frontmatter.load(f)
+    return dict(post.metadata), post.content
+
+
+def fast_reader(path: Path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_frontmatter(f.read())
+
+
+def corpus_files(repo_root: Path) -> List[Path]:
+    """Every canon and scene markdown file, index pages excluded"""
+    files = list((repo_root / "canon").glob("*/*.md")) + list((repo_root / "story" / "scenes").glob("*/*.md"))
+    return sorted(p for p in files if p.name != "index.md")
+
+
+def time_reader(reader: Callable, files: List[Path], rounds: int) -> float:
+    """Best-of-rounds wall time for reading every file once"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in files:
+            reader(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@click.command()
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--rounds', default=20, type=int, help='Timing rounds; the best one is reported')
+def main(repo_root: str, rounds: int):
+    """Compare frontmatter.load with the fast frontmatter reader"""
+    files = corpus_files(Path(repo_root))
+    if not files:
+        print("ERROR: No markdown files found under canon/ or story/scenes/")
+        sys.exit(1)
+
+    for path in files:
+        expected = python_frontmatter(path)
+        if fast_reader(path) != expected or read_header(path) != expected[0]:
+            print(f"ERROR: Fast reader disagrees with python-frontmatter on {path}")
+            sys.exit(1)
+
+    print(f"YAML loaders: fast reader uses {Loader.__name__}, python-frontmatter uses {FrontmatterLoader.__name__}")
+    print(f"Parsing {len(files)} files, best of {rounds} rounds\n")
+    baseline = time_reader(python_frontmatter, files, rounds)
+    results = [
+        ("frontmatter.load", baseline),
+        ("parse_frontmatter", time_reader(fast_reader, files, rounds)),
+        ("read_header", time_reader(read_header, files, rounds)),
+    ]
+    for name, elapsed in results:
+        per_file = elapsed / len(files) * 1e6
+        print(f"{name:<20} {elapsed * 1000:8.2f} ms  {per_file:8.1f} us/file  {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
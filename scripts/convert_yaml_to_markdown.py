@@ -4,12 +4,15 @@ Convert YAML files to individual markdown files with frontmatter.
 This script transforms the monolithic YAML structure into modular markdown files.
 """
 
+import sys
 import yaml
-import frontmatter
 from pathlib import Path
 from typing import Dict, List, Any
 import click
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "checks"))
+from fast_frontmatter import read_header
+
 def write_frontmatter_file(filepath: Path, frontmatter_data: Dict, content: str):
     """Write a file with frontmatter and content, handling encoding properly"""
     # Create the frontmatter string
@@ -291,15 +294,14 @@ def create_index_files(repo_root: Path):
     for char_file in char_files:
         if char_file.name == "index.md":
             continue
-        with open(char_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-            char_type = post.get('type', 'unknown')
-            char_name = post.get('name', char_file.stem)
+        post = read_header(char_file)
+        char_type = post.get('type', 'unknown')
+        char_name = post.get('name', char_file.stem)
 
-            if char_type == 'host':
-                chars_index += f"- [{char_name}]({char_file.name})\n"
-            else:
-                humans_index += f"- [{char_name}]({char_file.name})\n"
+        if char_type == 'host':
+            chars_index += f"- [{char_name}]({char_file.name})\n"
+        else:
+            humans_index += f"- [{char_name}]({char_file.name})\n"
 
     chars_index += humans_index
 
@@ -318,10 +320,9 @@ def create_index_files(repo_root: Path):
             for loc_file in loc_files:
                 if loc_file.name == "index.md":
                     continue
-                with open(loc_file, 'r', encoding='utf-8') as f:
-                    post = frontmatter.load(f)
-                    loc_name = post.get('name', loc_file.stem)
-                    locs_index += f"- [{loc_name}]({loc_file.name})\n"
+                post = read_header(loc_file)
+                loc_name = post.get('name', loc_file.stem)
+                locs_index += f"- [{loc_name}]({loc_file.name})\n"
 
             with open(locs_dir / "index.md", 'w', encoding='utf-8') as f:
                 f.write(locs_index)
@@ -336,10 +337,9 @@ def create_index_files(repo_root: Path):
             for theme_file in theme_files:
                 if theme_file.name == "index.md":
                     continue
-                with open(theme_file, 'r', encoding='utf-8') as f:
-                    post = frontmatter.load(f)
-                    theme_name = post.get('name', theme_file.stem)
-                    themes_index += f"- [{theme_name}]({theme_file.name})\n"
+                post = read_header(theme_file)
+                theme_name = post.get('name', theme_file.stem)
+                themes_index += f"- [{theme_name}]({theme_file.name})\n"
 
             with open(themes_dir / "index.md", 'w', encoding='utf-8') as f:
                 f.write(themes_index)
@@ -354,14 +354,13 @@ def create_index_files(repo_root: Path):
             for timeline_file in timeline_files:
                 if timeline_file.name == "index.md":
                     continue
-                with open(timeline_file, 'r', encoding='utf-8') as f:
-                    post = frontmatter.load(f)
-                    event_title = post.get('title', timeline_file.stem)
-                    event_date = post.get('date', '')
-                    if event_date:
-                        timeline_index += f"- [{event_title}]({timeline_file.name}) - {event_date}\n"
-                    else:
-                        timeline_index += f"- [{event_title}]({timeline_file.name})\n"
+                post = read_header(timeline_file)
+                event_title = post.get('title', timeline_file.stem)
+                event_date = post.get('date', '')
+                if event_date:
+                    timeline_index += f"- [{event_title}]({timeline_file.name}) - {event_date}\n"
+                else:
+                    timeline_index += f"- [{event_title}]({timeline_file.name})\n"
 
             with open(timeline_dir / "index.md", 'w', encoding='utf-8') as f:
                 f.write(timeline_index)
@@ -376,14 +375,13 @@ def create_index_files(repo_root: Path):
             for scene_file in scene_files:
                 if scene_file.name == "index.md":
                     continue
-                with open(scene_file, 'r', encoding='utf-8') as f:
-                    post = frontmatter.load(f)
-                    scene_title = post.get('title', scene_file.stem)
-                    scene_id = post.get('id', '')
-                    if scene_id:
-                        scenes_index += f"- [{scene_title}]({scene_file.name}) - {scene_id}\n"
-                    else:
-                        scenes_index += f"- [{scene_title}]({scene_file.name})\n"
+                post = read_header(scene_file)
+                scene_title = post.get('title', scene_file.stem)
+                scene_id = post.get('id', '')
+                if scene_id:
+                    scenes_index += f"- [{scene_title}]({scene_file.name}) - {scene_id}\n"
+                else:
+                    scenes_index += f"- [{scene_title}]({scene_file.name})\n"
 
             with open(scenes_dir / "index.md", 'w', encoding='utf-8') as f:
                 f.write(scenes_index)
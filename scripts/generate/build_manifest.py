@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Build manifest for incremental generation.
+Records, for every generated file, the generator code and the source entities
+it was built from together with their content digests, so later runs rebuild
+only the outputs whose inputs changed.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+MANIFEST_FILE = Path('.cache') / 'westworld' / 'build-manifest.json'
+
+# Source key for "every file of a kind", e.g. 'all:timeline'
+LISTING_PREFIX = 'all:'
+
+# Source key for some frontmatter fields and sections of every file of a kind,
+# e.g. 'parts:character:id,name:Relationships'
+PARTS_PREFIX = 'parts:'
+
+# Shared modules every generator reads the corpus through; their code is part of each generator's
+CHECKS_DIR = Path(__file__).resolve().parents[2] / "checks"
+PARSER_MODULES = tuple(str(CHECKS_DIR / name) for name in ('canon_store.py', 'sections.py', 'fast_frontmatter.py'))
+
+
+def code_digest(*paths: str) -> str:
+    """Fingerprint the source code of a generator"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def listing_key(kind: str) -> str:
+    return f"{LISTING_PREFIX}{kind}"
+
+
+def parts_key(kind: str, fields=(), sections=()) -> str:
+    return f"{PARTS_PREFIX}{kind}:{','.join(fields)}:{','.join(sections)}"
+
+
+def current_digest(store, key: str) -> Optional[str]:
+    """Digest a source key has in the corpus right now (None if it does not exist)"""
+    if key.startswith(LISTING_PREFIX):
+        return store.listing_digest(key[len(LISTING_PREFIX):])
+    if key.startswith(PARTS_PREFIX):
+        kind, fields, sections = key[len(PARTS_PREFIX):].split(':')
+        return store.parts_digest(kind, tuple(filter(None, fields.split(','))),
+                                  tuple(filter(None, sections.split(','))))
+    entry = store.by_id.get(key)
+    return entry.digest if entry is not None else None
+
+
+class BuildManifest:
+    """Generated file -> generator code digest and source digests"""
+
+    def __init__(self, repo_root: Path = Path(".")):
+        self.repo_root = Path(repo_root).resolve()
+        self.path = self.repo_root / MANIFEST_FILE
+        self.outputs: Dict[str, Dict] = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.outputs = json.load(f)
+        except (OSError, ValueError):
+            self.outputs = {}
+
+    def _key(self, output: Path) -> str:
+        output = Path(output).resolve()
+        try:
+            return output.relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return output.as_posix()
+
+    def is_fresh(self, output: Path, store, code: str) -> bool:
+        """True if the output exists and none of its recorded inputs changed"""
+        record = self.outputs.get(self._key(output))
+        if record is None or record['code'] != code or not Path(output).exists():
+            return False
+        return all(current_digest(store, key) == digest for key, digest in record['sources'].items())
+
+    def record(self, output: Path, sources: Dict[str, Optional[str]], code: str):
+        """Remember what an output was just built from"""
+        self.outputs[self._key(output)] = {'code': code, 'sources': dict(sorted(sources.items()))}
+        self.dirty = True
+
+    def forget(self, output: Path):
+        if self.outputs.pop(self._key(output), None) is not None:
+            self.dirty = True
+
+    def save(self):
+        """Write the manifest atomically if it changed"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.outputs, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.dirty = False
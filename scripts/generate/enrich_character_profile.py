@@ -4,127 +4,213 @@ Enrich character profiles by analyzing relationships and generating insights.
 This script takes character data and creates enriched profiles with additional analysis.
 """
 
-import frontmatter
+import re
+import sys
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Optional, Set
 import click
 
-def load_character_data(char_id: str, repo_root: Path) -> Dict:
-    """Load character data from markdown file"""
-    char_file = repo_root / "canon" / "characters" / f"{char_id.lower().replace('-', '_')}.md"
-    if char_file.exists():
-        with open(char_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-
-            # Extract content from markdown body
-            content = post.content
-            sections = {}
-
-            # Parse markdown sections
-            lines = content.split('\n')
-            current_section = None
-            current_content = []
-
-            for line in lines:
-                if line.startswith('## '):
-                    # Save previous section
-                    if current_section and current_content:
-                        sections[current_section] = '\n'.join(current_content).strip()
-                    # Start new section
-                    current_section = line[3:].strip()
-                    current_content = []
-                elif current_section:
-                    current_content.append(line)
-
-            # Save last section
-            if current_section and current_content:
-                sections[current_section] = '\n'.join(current_content).strip()
-
-            # Extract specific sections
-            traits = []
-            if 'Traits' in sections:
-                trait_lines = sections['Traits'].split('\n')
-                traits = [line.strip()[2:] for line in trait_lines if line.strip().startswith('- ')]
-
-            goals = []
-            if 'Goals' in sections:
-                goal_lines = sections['Goals'].split('\n')
-                goals = [line.strip()[2:] for line in goal_lines if line.strip().startswith('- ')]
-
-            relationships = {}
-            if 'Relationships' in sections:
-                rel_lines = sections['Relationships'].split('\n')
-                for line in rel_lines:
-                    if line.strip().startswith('- **'):
-                        # Parse relationship line like "- **Teddy**: Love interest"
-                        parts = line.strip()[2:].split('**: ')
-                        if len(parts) == 2:
-                            rel_name = parts[0].strip()
-                            rel_desc = parts[1].strip()
-                            relationships[rel_name] = rel_desc
-
-            backstory = sections.get('Backstory', '')
-            narrative_function = sections.get('Narrative Function', '')
-
-            return {
-                'id': post.get('id', char_id),
-                'name': post.get('name', char_id),
-                'type': post.get('type', 'unknown'),
-                'role': post.get('role', ''),
-                'status': post.get('status', ''),
-                'traits': traits,
-                'goals': goals,
-                'relationships': relationships,
-                'backstory': backstory,
-                'narrative_function': narrative_function
-            }
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "checks"))
+from canon_store import CanonEntry, CanonStore
+from build_manifest import PARSER_MODULES, BuildManifest, code_digest, current_digest, parts_key
+from output_writer import GeneratedOutputs
+import relationship_taxonomy
+from relationship_taxonomy import TAXONOMY_FILE, default_classifier
+
+# Files besides this one whose contents shape the profiles
+CODE_DEPENDENCIES = PARSER_MODULES + (relationship_taxonomy.__file__, str(TAXONOMY_FILE))
+
+# Relationship bullets look like "- **Teddy**: Love interest"
+RELATIONSHIP_LINE = re.compile(r'^\s*-\s+\*\*(.+?)\*\*:\s*(.*?)\s*$', re.MULTILINE)
+
+# Descriptions flagged as key relationships whatever their category
+KEY_MARKER = re.compile(r'\bkey\b', re.IGNORECASE)
+
+# Prefix of character IDs, dropped to give the short alias ("C-TEDDY" -> "TEDDY")
+ID_PREFIX = "C-"
+
+# The parts of the character files the relationship graph is built from; every profile
+# depends on these, but not on the rest of the other characters' files
+GRAPH_SOURCE = parts_key('character', ('id', 'name'), ('Relationships',))
+
+def parse_relationships(sections) -> Dict[str, str]:
+    """Map each display name in the Relationships section to its description"""
+    return dict(RELATIONSHIP_LINE.findall(sections.get('Relationships', '')))
+
+def name_key(name: str) -> str:
+    """Normalise a display name or ID for lookup, e.g. "Dr. Robert Ford" -> DR ROBERT FORD"""
+    return ' '.join(re.findall(r'[A-Z0-9]+', name.upper()))
+
+def load_character_data(char_id: str, store: CanonStore) -> Dict:
+    """Look up character data in the canon store"""
+    post = store.characters.get(char_id)
+    if post:
+        sections = post.sections
+
+        return {
+            'id': post.get('id', char_id),
+            'name': post.get('name', char_id),
+            'type': post.get('type', 'unknown'),
+            'role': post.get('role', ''),
+            'status': post.get('status', ''),
+            'traits': sections.bullets('Traits'),
+            'goals': sections.bullets('Goals'),
+            'relationships': parse_relationships(sections),
+            'backstory': sections.get('Backstory', ''),
+            'narrative_function': sections.get('Narrative Function', '')
+        }
     return {}
 
-def analyze_relationships(char_data: Dict, repo_root: Path) -> Dict:
+class Relationship:
+    """One Relationships bullet: who wrote it, who it names and how it describes them"""
+
+    __slots__ = ('source', 'name', 'target', 'description')
+
+    def __init__(self, source: str, name: str, target: Optional[str], description: str):
+        self.source = source
+        self.name = name
+        # Character ID the name resolves to, or None for people without a file
+        self.target = target
+        self.description = description
+
+class RelationshipGraph:
+    """Every character's relationships, resolved to IDs, built in one pass over the characters"""
+
+    def __init__(self, characters: List[CanonEntry], digest: str = ''):
+        # Listing digest of the characters the graph was built from
+        self.digest = digest
+        self.nodes: Dict[str, CanonEntry] = {}
+        self.edges: Dict[str, List[Relationship]] = {}
+        self.incoming: Dict[str, List[Relationship]] = {}
+        # Name key -> the one character it names; keys shared by several characters are dropped
+        self.aliases: Dict[str, str] = {}
+
+        raw: Dict[str, Dict[str, str]] = {}
+        candidates: Dict[str, Set[str]] = {}
+        for entry in characters:
+            if entry.error or not entry.id:
+                continue
+            char_id = entry.id
+            self.nodes[char_id] = entry
+            self.edges[char_id] = []
+            self.incoming[char_id] = []
+            raw[char_id] = parse_relationships(entry.sections)
+            name = name_key(entry.get('name', ''))
+            short = char_id[len(ID_PREFIX):] if char_id.startswith(ID_PREFIX) else char_id
+            for alias in (name_key(short), name, *name.split()):
+                if alias:
+                    candidates.setdefault(alias, set()).add(char_id)
+        self.aliases = {alias: ids.pop() for alias, ids in candidates.items() if len(ids) == 1}
+        # An exact ID always names its own character
+        self.aliases.update((name_key(char_id), char_id) for char_id in self.nodes)
+
+        for char_id, relationships in raw.items():
+            for name, description in relationships.items():
+                target = self.resolve(name)
+                rel = Relationship(char_id, name, target, description)
+                self.edges[char_id].append(rel)
+                if target is not None:
+                    self.incoming[target].append(rel)
+
+        # Degree centrality: share of the other characters linked in either direction
+        others = max(len(self.nodes) - 1, 1)
+        self.centrality: Dict[str, float] = {char_id: len(self.neighbours(char_id) - {char_id}) / others
+                                             for char_id in self.nodes}
+        ranked = sorted(self.nodes, key=lambda char_id: (-self.centrality[char_id], char_id))
+        self.rank: Dict[str, int] = {char_id: position for position, char_id in enumerate(ranked, 1)}
+
+    @classmethod
+    def from_store(cls, store: CanonStore) -> 'RelationshipGraph':
+        return cls(store.entries['character'], store.listing_digest('character'))
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Character ID for a display name such as "**TEDDY**" or "Dr. Ford", if exactly one matches"""
+        key = name_key(name)
+        if key in self.aliases:
+            return self.aliases[key]
+        words = [self.aliases.get(word) for word in key.split()]
+        matches = {char_id for char_id in words if char_id}
+        return matches.pop() if len(matches) == 1 else None
+
+    def neighbours(self, char_id: str) -> Set[str]:
+        """Characters linked to this one in either direction"""
+        linked = {rel.target for rel in self.edges.get(char_id, []) if rel.target}
+        linked.update(rel.source for rel in self.incoming.get(char_id, []))
+        return linked
+
+    def reciprocated(self, rel: Relationship) -> bool:
+        """True if the related character lists this one back"""
+        return rel.target is not None and any(back.target == rel.source for back in self.edges.get(rel.target, []))
+
+    def out_degree(self, char_id: str) -> int:
+        return len(self.edges.get(char_id, []))
+
+    def in_degree(self, char_id: str) -> int:
+        return len(self.incoming.get(char_id, []))
+
+# Graph of the corpus last seen in this process, reused while its characters are unchanged
+_graph: Optional[RelationshipGraph] = None
+
+def relationship_graph(store: CanonStore) -> RelationshipGraph:
+    """The store's relationship graph, built once per corpus state rather than per profile"""
+    global _graph
+    if _graph is None or _graph.digest != store.listing_digest('character'):
+        _graph = RelationshipGraph.from_store(store)
+    return _graph
+
+def analyze_relationships(char_data: Dict, graph: RelationshipGraph) -> Dict:
     """Analyze character relationships and create insights"""
-    relationships = char_data.get('relationships', {})
+    char_id = char_data['id']
+    relationships = graph.edges.get(char_id, [])
+    classifier = default_classifier()
     analysis = {
         'relationship_count': len(relationships),
         'relationship_types': {},
         'key_relationships': [],
-        'relationship_insights': []
+        'relationship_insights': [],
+        'in_degree': graph.in_degree(char_id),
+        'reciprocated': 0,
+        'centrality': graph.centrality.get(char_id, 0.0),
+        'rank': graph.rank.get(char_id),
+        'unresolved': []
     }
 
-    for rel_id, rel_desc in relationships.items():
-        # Load related character data
-        related_char = load_character_data(rel_id, repo_root)
-        if related_char:
-            # Categorize relationship type
-            rel_type = 'unknown'
-            if 'love' in rel_desc.lower() or 'romantic' in rel_desc.lower():
-                rel_type = 'romantic'
-            elif 'creator' in rel_desc.lower() or 'created' in rel_desc.lower():
-                rel_type = 'creation'
-            elif 'friend' in rel_desc.lower() or 'ally' in rel_desc.lower():
-                rel_type = 'alliance'
-            elif 'enemy' in rel_desc.lower() or 'adversary' in rel_desc.lower():
-                rel_type = 'conflict'
-            elif 'family' in rel_desc.lower() or 'father' in rel_desc.lower() or 'daughter' in rel_desc.lower():
-                rel_type = 'family'
-
-            if rel_type not in analysis['relationship_types']:
-                analysis['relationship_types'][rel_type] = 0
-            analysis['relationship_types'][rel_type] += 1
-
-            # Identify key relationships
-            if rel_type in ['romantic', 'creation', 'family'] or 'key' in rel_desc.lower():
-                analysis['key_relationships'].append({
-                    'character': related_char['name'],
-                    'type': rel_type,
-                    'description': rel_desc,
-                    'character_type': related_char['type']
-                })
+    for rel in relationships:
+        related_char = graph.nodes.get(rel.target) if rel.target else None
+        if related_char is None:
+            analysis['unresolved'].append(rel.name)
+            continue
+
+        # Categorize relationship type
+        rel_type = classifier.classify(rel.description).category
+
+        if rel_type not in analysis['relationship_types']:
+            analysis['relationship_types'][rel_type] = 0
+        analysis['relationship_types'][rel_type] += 1
+
+        mutual = graph.reciprocated(rel)
+        if mutual:
+            analysis['reciprocated'] += 1
+
+        # Identify key relationships
+        if rel_type in ['romantic', 'creation', 'family'] or KEY_MARKER.search(rel.description):
+            analysis['key_relationships'].append({
+                'character': related_char.get('name', rel.target),
+                'type': rel_type,
+                'description': rel.description,
+                'character_type': related_char.get('type', 'unknown'),
+                'mutual': mutual
+            })
 
     # Generate insights
     if analysis['relationship_count'] > 5:
         analysis['relationship_insights'].append(
             "This character has many connections, suggesting a central role in the narrative.")
 
+    if analysis['rank'] == 1 and len(graph.nodes) > 1:
+        analysis['relationship_insights'].append(
+            "This character is the most connected in the relationship network.")
+
     if 'creation' in analysis['relationship_types']:
         analysis['relationship_insights'].append(
             "This character has creator/creation relationships, indicating artificial origins or significant influence.")
@@ -188,12 +274,19 @@ def create_enriched_profile(char_data: Dict, relationship_analysis: Dict, insigh
 ### Relationship Network
 - **Total Relationships**: {relationship_analysis['relationship_count']}
 - **Relationship Types**: {', '.join(f'{k}: {v}' for k, v in relationship_analysis['relationship_types'].items())}
+- **Reciprocated**: {relationship_analysis['reciprocated']} of {relationship_analysis['relationship_count']}
+- **Listed By**: {relationship_analysis['in_degree']} characters
+- **Degree Centrality**: {relationship_analysis['centrality']:.2f} (rank {relationship_analysis['rank']})
 
 ### Key Relationships
 """
 
     for rel in relationship_analysis['key_relationships']:
-        profile += f"- **{rel['character']}** ({rel['type']}): {rel['description']}\n"
+        mutual = ", mutual" if rel['mutual'] else ""
+        profile += f"- **{rel['character']}** ({rel['type']}{mutual}): {rel['description']}\n"
+
+    if relationship_analysis['unresolved']:
+        profile += f"\n*Not in the character files*: {', '.join(relationship_analysis['unresolved'])}\n"
 
     profile += "\n### Character Insights\n"
     for insight in insights:
@@ -224,23 +317,37 @@ def create_enriched_profile(char_data: Dict, relationship_analysis: Dict, insigh
 
     return profile
 
-def process_character_file(char_file: Path, repo_root: Path, output_dir: Path):
-    """Process a single character file and create enriched profile"""
-    try:
-        with open(char_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
+# Every enriched profile in the output directory, for removing orphaned ones
+PROFILE_PATTERN = "*_enriched.md"
 
-        char_id = post.get('id', char_file.stem)
-        char_name = post.get('name', 'Unknown Character')
+def profile_file(char_entry: CanonEntry, output_dir: Path) -> Path:
+    """Return the enriched profile output path for a character"""
+    char_id = char_entry.get('id', char_entry.path.stem)
+    return output_dir / f"{char_id.lower().replace('-', '_')}_enriched.md"
 
-        # Load character data
-        char_data = load_character_data(char_id, repo_root)
-        if not char_data:
-            print(f"ERROR: Failed to load character data for {char_name}")
-            return
+def process_character_file(char_entry: CanonEntry, store: CanonStore, output_dir: Path,
+                           outputs: GeneratedOutputs) -> Optional[Dict]:
+    """Process a single character file and create enriched profile, returning the sources it used"""
+    try:
+        if char_entry.error:
+            raise ValueError(char_entry.error)
+
+        char_id = char_entry.get('id', char_entry.path.stem)
+        char_name = char_entry.get('name', 'Unknown Character')
+
+        graph = relationship_graph(store)
+        with store.recording() as sources:
+            # Load character data
+            char_data = load_character_data(char_id, store)
+            if not char_data:
+                print(f"ERROR: Failed to load character data for {char_name}")
+                return None
+        # Degrees, ranks and related names come from the graph, i.e. every character's
+        # ID, name and relationships
+        sources[GRAPH_SOURCE] = current_digest(store, GRAPH_SOURCE)
 
         # Analyze relationships
-        relationship_analysis = analyze_relationships(char_data, repo_root)
+        relationship_analysis = analyze_relationships(char_data, graph)
 
         # Generate insights
         insights = generate_character_insights(char_data, relationship_analysis)
@@ -249,52 +356,81 @@ def process_character_file(char_file: Path, repo_root: Path, output_dir: Path):
         enriched_profile = create_enriched_profile(char_data, relationship_analysis, insights)
 
         # Write output
-        output_file = output_dir / f"{char_id.lower().replace('-', '_')}_enriched.md"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(enriched_profile)
+        outputs.write_text(profile_file(char_entry, output_dir), enriched_profile)
 
         print(f"SUCCESS: Generated enriched profile for {char_name}")
+        return sources
 
     except Exception as e:
-        print(f"ERROR: Failed to process {char_file.name}: {e}")
-
-@click.command()
-@click.option('--character-id', help='Specific character ID to process')
-@click.option('--output-dir', default='generated/summaries', help='Output directory for enriched profiles')
-@click.option('--repo-root', default='.', help='Repository root directory')
-def main(character_id: str, output_dir: str, repo_root: str):
-    """Enrich character profiles with relationship analysis and insights"""
-    global repo_path
-    repo_path = Path(repo_root)
-    output_path = Path(output_dir)
-
+        print(f"ERROR: Failed to process {char_entry.path.name}: {e}")
+        return None
+
+def enrich_profile_batch(store: CanonStore, output_path: Path, indices: Iterable[int]) -> GeneratedOutputs:
+    """Enrich profiles for the given character positions, returning the outputs and their sources"""
+    outputs = GeneratedOutputs()
+    characters = store.entries['character']
+    for index in indices:
+        sources = process_character_file(characters[index], store, output_path, outputs)
+        if sources is not None:
+            outputs.record(profile_file(characters[index], output_path), sources)
+    return outputs
+
+def enrich_profiles(store: CanonStore, output_path: Path, character_id: str = None,
+                    manifest: Optional[BuildManifest] = None) -> bool:
+    """Enrich one character profile or every character in the store"""
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
 
     print("Enriching character profiles...\n")
 
+    characters = store.entries['character']
     if character_id:
         # Process specific character
-        char_file = repo_path / "canon" / "characters" / f"{character_id.lower().replace('-', '_')}.md"
-        if char_file.exists():
-            process_character_file(char_file, repo_path, output_path)
-        else:
-            print(f"ERROR: Character file not found: {char_file}")
-            exit(1)
+        char_entry = store.characters.get(character_id.upper().replace('_', '-'))
+        if not char_entry:
+            print(f"ERROR: Character not found: {character_id}")
+            return False
+        indices = [characters.index(char_entry)]
     else:
         # Process all characters
-        chars_dir = repo_path / "canon" / "characters"
-        if not chars_dir.exists():
+        if not store.directory('character').exists():
             print("ERROR: Characters directory not found")
-            exit(1)
-
-        char_files = list(chars_dir.glob("*.md"))
-        for char_file in char_files:
-            if char_file.name == "index.md":
-                continue
-            process_character_file(char_file, repo_path, output_path)
+            return False
+        indices = range(len(characters))
+
+    code = code_digest(__file__, *CODE_DEPENDENCIES)
+    if manifest is not None:
+        # Skip characters whose file and the relationship graph are unchanged
+        stale = [i for i in indices if not manifest.is_fresh(profile_file(characters[i], output_path), store, code)]
+        if len(stale) < len(indices):
+            print(f"Up to date: {len(indices) - len(stale)} profiles")
+        indices = stale
+
+    outputs = enrich_profile_batch(store, output_path, indices)
+    if not character_id:
+        outputs.remove_orphans(characters, profile_file, output_path, PROFILE_PATTERN)
+
+    if manifest is not None:
+        for output_file, sources in outputs.sources.items():
+            manifest.record(Path(output_file), sources, code)
+        for output_file in outputs.deleted:
+            manifest.forget(Path(output_file))
+        manifest.save()
+
+    print(f"\nSUCCESS: Enriched profiles generated in {output_path} ({outputs.summary()})")
+    return True
 
-    print(f"\nSUCCESS: Enriched profiles generated in {output_path}")
+@click.command()
+@click.option('--character-id', help='Specific character ID to process')
+@click.option('--output-dir', default='generated/summaries', help='Output directory for enriched profiles')
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--force', is_flag=True, help='Rebuild every profile even if its sources are unchanged')
+def main(character_id: str, output_dir: str, repo_root: str, force: bool):
+    """Enrich character profiles with relationship analysis and insights"""
+    store = CanonStore(Path(repo_root))
+    manifest = None if force else BuildManifest(Path(repo_root))
+    if not enrich_profiles(store, Path(output_dir), character_id, manifest):
+        exit(1)
 
 
 if __name__ == "__main__":
@@ -4,264 +4,239 @@ Generate narrative prose from scene markdown files.
 This script takes scene data and creates flowing narrative text.
 """
 
-import frontmatter
+import sys
 from pathlib import Path
-from typing import Dict, List
+from string import Formatter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 import click
 
-def load_character_data(char_id: str, repo_root: Path) -> Dict:
-    """Load character data from markdown file"""
-    char_file = repo_root / "canon" / "characters" / f"{char_id.lower().replace('-', '_')}.md"
-    if char_file.exists():
-        with open(char_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-            return {
-                'name': post.get('name', char_id),
-                'type': post.get('type', 'unknown'),
-                'role': post.get('role', ''),
-                'traits': post.get('traits', [])
-            }
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "checks"))
+from canon_store import CanonEntry, CanonStore
+from sections import SectionIndex
+from build_manifest import PARSER_MODULES, BuildManifest, code_digest
+from output_writer import GeneratedOutputs
+
+# Files besides this one whose contents shape the narratives
+CODE_DEPENDENCIES = PARSER_MODULES
+
+def load_character_data(char_id: str, store: CanonStore) -> Dict:
+    """Look up character data in the canon store"""
+    post = store.characters.get(char_id)
+    if post:
+        return {
+            'name': post.get('name', char_id),
+            'type': post.get('type', 'unknown'),
+            'role': post.get('role', ''),
+            'traits': post.get('traits', [])
+        }
     return {'name': char_id, 'type': 'unknown', 'role': '', 'traits': []}
 
-def load_location_data(loc_id: str, repo_root: Path) -> Dict:
-    """Load location data from markdown file"""
-    loc_file = repo_root / "canon" / "locations" / f"{loc_id.lower().replace('-', '_')}.md"
-    if loc_file.exists():
-        with open(loc_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-            # Extract description from content
-            content = post.content
-            description = ""
-            if "## Overview" in content:
-                overview_section = content.split("## Overview")[1].split("##")[0]
-                description = overview_section.strip()
-
-            return {
-                'name': post.get('name', loc_id),
-                'description': description,
-                'region': post.get('region', '')
-            }
+def load_location_data(loc_id: str, store: CanonStore) -> Dict:
+    """Look up location data in the canon store"""
+    post = store.locations.get(loc_id)
+    if post:
+        return {
+            'name': post.get('name', loc_id),
+            'description': post.sections.get('Overview', ''),
+            'region': post.get('region', '')
+        }
     return {'name': loc_id, 'description': '', 'region': ''}
 
-def generate_narrative_prose(scene_data: Dict, repo_root: Path) -> str:
-    """Generate narrative prose from scene data"""
+# Narrative layout, one block per section: (header, context key, item template,
+# footer). A block is written only when its context value has items; every item
+# is formatted with the template as `item`
+NARRATIVE_TEMPLATE = (
+    ('', 'title', '# {item}\n\n', ''),
+    ('', 'setting', '{item}.\n\n', ''),
+    ('## Characters Present\n\n', 'characters', '**{item[name]}** - {item[role]}{item[traits]}\n\n', ''),
+    ('## Narrative\n\n', 'synopsis', '{item}\n\n', ''),
+    ('### Key Actions\n\n', 'actions', '- {item}\n', '\n'),
+    ('### Emotional Beats\n\n', 'emotions', '- {item}\n', '\n'),
+    ('### Key Dialogue\n\n', 'dialogue', '> "{item}"\n\n', ''),
+    ('### Revelations\n\n', 'reveals', '- {item}\n', '\n'),
+    ('### Conflicts\n\n', 'conflicts', '- {item}\n', '\n'),
+    ('## Themes Explored\n\n', 'themes', '- {item}\n', '\n'),
+    ('## Narrative Connections\n\n', 'connections', '- {item}\n', '\n'),
+)
+
+class CompiledTemplate:
+    """Block templates parsed once and rendered straight into a writer, one chunk per block"""
+
+    def __init__(self, blocks: Iterable[Tuple[str, str, str, str]]):
+        self.blocks = []
+        for header, key, item, footer in blocks:
+            # Fail on a malformed template when it is compiled, not mid-run
+            list(Formatter().parse(item))
+            self.blocks.append((header, key, item.format, footer))
+
+    def render(self, context: Dict[str, List], write: Callable[[str], object]):
+        for header, key, format_item, footer in self.blocks:
+            items = context.get(key)
+            if items:
+                write(header + ''.join([format_item(item=item) for item in items]) + footer)
+
+COMPILED_NARRATIVE = CompiledTemplate(NARRATIVE_TEMPLATE)
+
+def narrative_context(scene_data: Dict, store: CanonStore) -> Dict[str, List]:
+    """Resolve everything a narrative shows, as a list of items per template block"""
     title = scene_data.get('title', 'Unknown Scene')
     location_id = scene_data.get('location', '')
     timestamp = scene_data.get('timestamp', '')
     themes = scene_data.get('themes', [])
 
-    # Extract sections from content using a more reliable method
-    content = scene_data.get('content', '')
-    sections = {}
-
-    # Split content into sections
-    lines = content.split('\n')
-    current_section = None
-    current_content = []
-
-    for line in lines:
-        if line.startswith('## '):
-            # Save previous section
-            if current_section and current_content:
-                sections[current_section] = '\n'.join(current_content).strip()
-            # Start new section
-            current_section = line[3:].strip()
-            current_content = []
-        elif current_section:
-            current_content.append(line)
-
-    # Save last section
-    if current_section and current_content:
-        sections[current_section] = '\n'.join(current_content).strip()
-
-    # Extract specific sections
-    synopsis = sections.get('Synopsis', '')
-    characters = []
-    if 'Characters' in sections:
-        char_lines = sections['Characters'].split('\n')
-        characters = [line.strip()[2:] for line in char_lines if line.strip().startswith('- ')]
-
-    actions = []
-    if 'Actions' in sections:
-        action_lines = sections['Actions'].split('\n')
-        actions = [line.strip()[2:] for line in action_lines if line.strip().startswith('- ')]
-
-    emotions = []
-    if 'Emotions' in sections:
-        emotion_lines = sections['Emotions'].split('\n')
-        emotions = [line.strip()[2:] for line in emotion_lines if line.strip().startswith('- ')]
-
-    dialogue = []
-    if 'Key Dialogue' in sections:
-        dialogue_lines = sections['Key Dialogue'].split('\n')
-        dialogue = [line.strip()[2:] for line in dialogue_lines if line.strip().startswith('- ')]
-
-    reveals = []
-    if 'Reveals' in sections:
-        reveal_lines = sections['Reveals'].split('\n')
-        reveals = [line.strip()[2:] for line in reveal_lines if line.strip().startswith('- ')]
-
-    conflicts = []
-    if 'Conflicts' in sections:
-        conflict_lines = sections['Conflicts'].split('\n')
-        conflicts = [line.strip()[2:] for line in conflict_lines if line.strip().startswith('- ')]
-
-    connections = []
-    if 'Connections' in sections:
-        connection_lines = sections['Connections'].split('\n')
-        connections = [line.strip()[2:] for line in connection_lines if line.strip().startswith('- ')]
+    # Sections are indexed once; each one is sliced only when used
+    sections = scene_data.get('sections')
+    if sections is None:
+        sections = SectionIndex(scene_data.get('content', ''))
 
     # Load location details
-    location = load_location_data(location_id, repo_root)
+    location = load_location_data(location_id, store)
+
+    # Setting
+    setting = []
+    if location['name']:
+        if timestamp:
+            opening = f"The scene opens at {timestamp.lower()} in {location['name']}"
+        else:
+            opening = f"The scene takes place in {location['name']}"
+        if location['description']:
+            opening += f", {location['description'].lower()}"
+        setting.append(opening)
 
     # Load character details
-    char_details = []
-    for char_id in characters:
-        char_data = load_character_data(char_id, repo_root)
-        char_details.append(char_data)
+    characters = []
+    for char_id in sections.bullets('Characters'):
+        char = load_character_data(char_id, store)
+        traits = f" ({', '.join(char['traits'][:2])})" if char['traits'] else ''
+        characters.append({'name': char['name'], 'role': char['role'], 'traits': traits})
 
-    # Generate narrative
-    narrative = f"# {title}\n\n"
+    synopsis = sections.get('Synopsis', '')
+    return {
+        'title': [title],
+        'setting': setting,
+        'characters': characters,
+        'synopsis': [synopsis] if synopsis else [],
+        'actions': sections.bullets('Actions'),
+        'emotions': sections.bullets('Emotions'),
+        # Quotes are added by the template
+        'dialogue': [line.strip('"') for line in sections.bullets('Key Dialogue')],
+        'reveals': sections.bullets('Reveals'),
+        'conflicts': sections.bullets('Conflicts'),
+        'themes': themes,
+        'connections': sections.bullets('Connections'),
+    }
+
+def render_narrative(scene_data: Dict, store: CanonStore, write: Callable[[str], object]):
+    """Write a scene's narrative chunk by chunk, e.g. straight to a file handle"""
+    COMPILED_NARRATIVE.render(narrative_context(scene_data, store), write)
+
+def generate_narrative_prose(scene_data: Dict, store: CanonStore) -> str:
+    """Generate narrative prose from scene data"""
+    chunks = []
+    render_narrative(scene_data, store, chunks.append)
+    return ''.join(chunks)
 
-    # Setting
-    if timestamp and location['name']:
-        narrative += f"The scene opens at {timestamp.lower()} in {location['name']}"
-        if location['description']:
-            narrative += f", {location['description'].lower()}"
-        narrative += ".\n\n"
-    elif location['name']:
-        narrative += f"The scene takes place in {location['name']}"
-        if location['description']:
-            narrative += f", {location['description'].lower()}"
-        narrative += ".\n\n"
-
-    # Character introductions
-    if char_details:
-        narrative += "## Characters Present\n\n"
-        for char in char_details:
-            narrative += f"**{char['name']}** - {char['role']}"
-            if char['traits']:
-                narrative += f" ({', '.join(char['traits'][:2])})"
-            narrative += "\n\n"
-
-    # Main narrative
-    if synopsis:
-        narrative += "## Narrative\n\n"
-        narrative += f"{synopsis}\n\n"
-
-    # Add details from scene data
-    if actions:
-        narrative += "### Key Actions\n\n"
-        for action in actions:
-            narrative += f"- {action}\n"
-        narrative += "\n"
-
-    if emotions:
-        narrative += "### Emotional Beats\n\n"
-        for emotion in emotions:
-            narrative += f"- {emotion}\n"
-        narrative += "\n"
-
-    if dialogue:
-        narrative += "### Key Dialogue\n\n"
-        for line in dialogue:
-            # Remove quotes if they exist
-            clean_line = line.strip('"')
-            narrative += f"> \"{clean_line}\"\n\n"
-
-    if reveals:
-        narrative += "### Revelations\n\n"
-        for reveal in reveals:
-            narrative += f"- {reveal}\n"
-        narrative += "\n"
-
-    if conflicts:
-        narrative += "### Conflicts\n\n"
-        for conflict in conflicts:
-            narrative += f"- {conflict}\n"
-        narrative += "\n"
-
-    # Themes
-    if themes:
-        narrative += "## Themes Explored\n\n"
-        for theme_id in themes:
-            narrative += f"- {theme_id}\n"
-        narrative += "\n"
-
-    # Connections
-    if connections:
-        narrative += "## Narrative Connections\n\n"
-        for connection in connections:
-            narrative += f"- {connection}\n"
-        narrative += "\n"
-
-    return narrative
-
-def process_scene_file(scene_file: Path, repo_root: Path, output_dir: Path):
-    """Process a single scene file and generate narrative"""
-    try:
-        with open(scene_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
+# Every narrative file in the output directory, for removing orphaned ones
+NARRATIVE_PATTERN = "*_narrative.md"
 
-        scene_id = post.get('id', scene_file.stem)
-        scene_title = post.get('title', 'Unknown Scene')
+def narrative_file(scene_entry: CanonEntry, output_dir: Path) -> Path:
+    """Return the narrative output path for a scene"""
+    scene_id = scene_entry.get('id', scene_entry.path.stem)
+    return output_dir / f"{scene_id.lower().replace('-', '_')}_narrative.md"
 
-        # Get the full markdown content (everything after frontmatter)
-        markdown_content = post.content
+def process_scene_file(scene_entry: CanonEntry, store: CanonStore, output_dir: Path,
+                       outputs: GeneratedOutputs) -> Optional[Dict]:
+    """Process a single scene file and generate narrative, returning the sources it used"""
+    try:
+        if scene_entry.error:
+            raise ValueError(scene_entry.error)
 
-        # Create a scene_data dict that includes the parsed content
-        scene_data = dict(post)
-        scene_data['content'] = markdown_content
+        scene_title = scene_entry.get('title', 'Unknown Scene')
 
-        # Generate narrative
-        narrative = generate_narrative_prose(scene_data, repo_root)
+        # Create a scene_data dict that includes the parsed content
+        scene_data = dict(scene_entry.metadata)
+        scene_data['content'] = scene_entry.content
+        scene_data['sections'] = scene_entry.sections
 
-        # Write output
-        output_file = output_dir / f"{scene_id.lower().replace('-', '_')}_narrative.md"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(narrative)
+        # Render straight into the output, noting every character and location it resolves
+        output_file = narrative_file(scene_entry, output_dir)
+        with store.recording() as sources, outputs.open(output_file) as write:
+            render_narrative(scene_data, store, write)
+        sources[scene_entry.id] = scene_entry.digest
 
         print(f"SUCCESS: Generated narrative for {scene_title}")
+        return sources
 
     except Exception as e:
-        print(f"ERROR: Failed to process {scene_file.name}: {e}")
-
-@click.command()
-@click.option('--scene-id', help='Specific scene ID to process')
-@click.option('--output-dir', default='generated/narratives', help='Output directory for narratives')
-@click.option('--repo-root', default='.', help='Repository root directory')
-def main(scene_id: str, output_dir: str, repo_root: str):
-    """Generate narrative prose from scene markdown files"""
-    repo_path = Path(repo_root)
-    output_path = Path(output_dir)
-
+        print(f"ERROR: Failed to process {scene_entry.path.name}: {e}")
+        return None
+
+def generate_narrative_batch(store: CanonStore, output_path: Path, indices: Iterable[int]) -> GeneratedOutputs:
+    """Generate narratives for the given scene positions, returning the outputs and their sources"""
+    outputs = GeneratedOutputs()
+    scenes = store.entries['scene']
+    for index in indices:
+        sources = process_scene_file(scenes[index], store, output_path, outputs)
+        if sources is not None:
+            outputs.record(narrative_file(scenes[index], output_path), sources)
+    return outputs
+
+def generate_narratives(store: CanonStore, output_path: Path, scene_id: str = None,
+                        manifest: Optional[BuildManifest] = None) -> bool:
+    """Generate narratives for one scene or every scene in the store"""
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
 
     print("Generating narratives from scenes...\n")
 
+    scenes = store.entries['scene']
     if scene_id:
         # Process specific scene
-        scene_file = repo_path / "story" / "scenes" / "s01e01" / f"{scene_id.lower().replace('-', '_')}.md"
-        if scene_file.exists():
-            process_scene_file(scene_file, repo_path, output_path)
-        else:
-            print(f"ERROR: Scene file not found: {scene_file}")
-            exit(1)
+        scene_entry = store.scenes.get(scene_id.upper().replace('_', '-'))
+        if not scene_entry:
+            print(f"ERROR: Scene not found: {scene_id}")
+            return False
+        indices = [scenes.index(scene_entry)]
     else:
         # Process all scenes
-        scenes_dir = repo_path / "story" / "scenes" / "s01e01"
-        if not scenes_dir.exists():
+        if not store.directory('scene').exists():
             print("ERROR: Scenes directory not found")
-            exit(1)
-
-        scene_files = list(scenes_dir.glob("*.md"))
-        for scene_file in scene_files:
-            if scene_file.name == "index.md":
-                continue
-            process_scene_file(scene_file, repo_path, output_path)
+            return False
+        indices = range(len(scenes))
+
+    code = code_digest(__file__, *CODE_DEPENDENCIES)
+    if manifest is not None:
+        # Skip scenes whose scene, characters and location are unchanged
+        stale = [i for i in indices if not manifest.is_fresh(narrative_file(scenes[i], output_path), store, code)]
+        if len(stale) < len(indices):
+            print(f"Up to date: {len(indices) - len(stale)} narratives")
+        indices = stale
+
+    outputs = generate_narrative_batch(store, output_path, indices)
+    if not scene_id:
+        outputs.remove_orphans(scenes, narrative_file, output_path, NARRATIVE_PATTERN)
+
+    if manifest is not None:
+        for output_file, sources in outputs.sources.items():
+            manifest.record(Path(output_file), sources, code)
+        for output_file in outputs.deleted:
+            manifest.forget(Path(output_file))
+        manifest.save()
+
+    print(f"\nSUCCESS: Narratives generated in {output_path} ({outputs.summary()})")
+    return True
 
-    print(f"\nSUCCESS: Narratives generated in {output_path}")
+@click.command()
+@click.option('--scene-id', help='Specific scene ID to process')
+@click.option('--output-dir', default='generated/narratives', help='Output directory for narratives')
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--force', is_flag=True, help='Rebuild every narrative even if its sources are unchanged')
+def main(scene_id: str, output_dir: str, repo_root: str, force: bool):
+    """Generate narrative prose from scene markdown files"""
+    store = CanonStore(Path(repo_root))
+    manifest = None if force else BuildManifest(Path(repo_root))
+    if not generate_narratives(store, Path(output_dir), scene_id, manifest):
+        exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Skip-unchanged, atomic writing of generated files.
+Each output is streamed into a temporary file next to its target, hashed, and
+only replaces the target (by rename) when its bytes differ, so
+regenerating identical content leaves files, their mtimes and git untouched.
+Outputs whose source no longer exists are removed, and every write is counted.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List
+
+# Bytes read at a time when hashing an existing output
+READ_SIZE = 1 << 16
+
+# mkstemp creates files readable only by their owner; outputs get the usual mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+OUTPUT_MODE = 0o666 & ~_UMASK
+
+
+def file_digest(path: Path) -> str:
+    """Digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def same_content(new: Path, existing: Path) -> bool:
+    """True if existing holds exactly the bytes of new; sizes are compared before hashing"""
+    try:
+        if os.path.getsize(new) != os.path.getsize(existing):
+            return False
+    except FileNotFoundError:
+        return False
+    return file_digest(new) == file_digest(existing)
+
+
+class GeneratedOutputs:
+    """Files a generator produced: what each was built from and what happened on disk"""
+
+    __slots__ = ('sources', 'written', 'unchanged', 'deleted')
+
+    def __init__(self):
+        # Output path -> source keys and digests it was built from
+        self.sources: Dict[str, Dict] = {}
+        self.written = 0
+        self.unchanged = 0
+        self.deleted: List[str] = []
+
+    @contextmanager
+    def open(self, path: Path) -> Iterator[Callable[[str], object]]:
+        """Yield a write function for an output; on success the target is replaced
+        atomically if the new bytes differ, and left alone if they are identical"""
+        path = Path(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                yield f.write
+            if same_content(tmp, path):
+                os.unlink(tmp)
+                self.unchanged += 1
+            else:
+                os.chmod(tmp, OUTPUT_MODE)
+                os.replace(tmp, path)
+                self.written += 1
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def write_text(self, path: Path, text: str):
+        with self.open(path) as write:
+            write(text)
+
+    def record(self, path: Path, sources: Dict):
+        self.sources[str(path)] = sources
+
+    def remove_stale(self, directory: Path, pattern: str, keep: Iterable[Path]) -> List[str]:
+        """Delete files in directory matching pattern that are not among the current outputs"""
+        keep = {Path(path).resolve() for path in keep}
+        removed = []
+        for path in sorted(Path(directory).glob(pattern)):
+            if path.resolve() not in keep:
+                path.unlink()
+                removed.append(str(path))
+        self.deleted.extend(removed)
+        return removed
+
+    def remove_orphans(self, entries: List, output_file: Callable, output_dir: Path, pattern: str) -> List[str]:
+        """Delete per-entry outputs whose source file is gone; nothing is deleted while
+        any source fails to parse, since its output name is then unknown"""
+        if any(entry.error for entry in entries):
+            return []
+        return self.remove_stale(output_dir, pattern, [output_file(entry, output_dir) for entry in entries])
+
+    def update(self, other: 'GeneratedOutputs'):
+        """Fold in the outputs of another batch"""
+        self.sources.update(other.sources)
+        self.written += other.written
+        self.unchanged += other.unchanged
+        self.deleted.extend(other.deleted)
+
+    def summary(self) -> str:
+        return f"{self.written} written, {self.unchanged} unchanged, {len(self.deleted)} deleted"
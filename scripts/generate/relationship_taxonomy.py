@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Relationship typing from a configurable keyword taxonomy.
+The keywords of every category in relationship_taxonomy.yml are compiled once
+into a single case-insensitive trie-shaped regex. A description is classified
+in one scan of its lowercased text, with no keyword-by-keyword tests; only the
+words that match are looked up to find their category.
+Each classification keeps the matched keyword's span as evidence, which makes
+it cheap enough to run over scene conflicts and reveals as well.
+"""
+
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Pattern, Tuple
+import click
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "checks"))
+from canon_store import CanonStore
+
+TAXONOMY_FILE = Path(__file__).resolve().with_name("relationship_taxonomy.yml")
+
+# Category given to text that matches no keyword
+UNKNOWN = 'unknown'
+
+# Scene sections whose bullets are classified by the command below
+SCENE_SECTIONS = ('Conflicts', 'Reveals')
+
+
+class Classification:
+    """A category and the keyword span in the text that decided it"""
+
+    __slots__ = ('category', 'start', 'end', 'evidence')
+
+    def __init__(self, category: str, start: int = -1, end: int = -1, evidence: str = ''):
+        self.category = category
+        self.start = start
+        self.end = end
+        self.evidence = evidence
+
+    def __repr__(self) -> str:
+        return f"Classification({self.category}, {self.evidence!r} at {self.start}:{self.end})"
+
+
+def keyword_trie(keywords: Dict[str, bool]) -> str:
+    """Regex matching any keyword (lowercase, mapped to whether it is a prefix) from a word
+    start, written as a trie so each position is tried against first letters, not every keyword"""
+    trie: Dict = {}
+    for keyword, prefix in keywords.items():
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = node.get('', False) or prefix
+
+    def build(node: Dict) -> str:
+        alternatives = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                        for char, child in sorted(node.items()) if char]
+        if '' in node:
+            # Longer keywords are tried first; a prefix keyword takes the rest of the word
+            alternatives.append(r'\w*' if node[''] else r'\b')
+        return alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+
+    return rf"\b{build(trie)}"
+
+
+class RelationshipClassifier:
+    """Taxonomy categories compiled into one keyword trie, first-listed category winning"""
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        if not self.categories:
+            raise ValueError("relationship taxonomy defines no categories")
+        # Keyword -> rank of the first category listing it, for whole words and for prefixes
+        self.words: Dict[str, int] = {}
+        self.prefixes: Dict[str, int] = {}
+        for rank, (category, keywords) in enumerate(categories.items()):
+            if not keywords:
+                raise ValueError(f"relationship category {category!r} has no keywords")
+            for keyword in keywords:
+                keyword = str(keyword).lower()
+                table = self.prefixes if keyword.endswith('*') else self.words
+                table.setdefault(' '.join(keyword.rstrip('*').split()), rank)
+        self.prefix_lengths = sorted({len(prefix) for prefix in self.prefixes}, reverse=True)
+        keywords = {**{word: False for word in self.words}, **{prefix: True for prefix in self.prefixes}}
+        # Matched against lowercased text; the case-insensitive form is for text whose length
+        # changes when lowercased, where spans would not line up
+        self.pattern = re.compile(keyword_trie(keywords))
+        self.pattern_any_case = re.compile(self.pattern.pattern, re.IGNORECASE)
+        # Matched text -> rank, since the same few words recur across a corpus
+        self.ranks: Dict[str, int] = {}
+
+    def rank(self, matched: str) -> int:
+        """Rank of the first category with a keyword matching this text"""
+        rank = self.ranks.get(matched)
+        if rank is None:
+            key = ' '.join(matched.lower().split())
+            ranks = [self.prefixes[key[:n]] for n in self.prefix_lengths if key[:n] in self.prefixes]
+            if key in self.words:
+                ranks.append(self.words[key])
+            rank = self.ranks[matched] = min(ranks)
+        return rank
+
+    def _scan(self, text: str) -> Tuple[Pattern, str]:
+        """Pattern and string to scan: the lowercased text unless lowercasing changes its length"""
+        folded = text.lower()
+        if len(folded) == len(text):
+            return self.pattern, folded
+        return self.pattern_any_case, text
+
+    @classmethod
+    def load(cls, taxonomy_file: Path = TAXONOMY_FILE) -> 'RelationshipClassifier':
+        with open(taxonomy_file, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        categories = data.get('categories')
+        if not isinstance(categories, dict):
+            raise ValueError(f"{taxonomy_file} has no 'categories' mapping")
+        return cls({str(category): list(keywords or []) for category, keywords in categories.items()})
+
+    def matches(self, text: str) -> Iterator[Classification]:
+        """Every keyword match in the text, in order of position"""
+        pattern, scanned = self._scan(text)
+        for match in pattern.finditer(scanned):
+            start, end = match.span()
+            yield Classification(self.categories[self.rank(match.group())], start, end, text[start:end])
+
+    def classify(self, text: str) -> Classification:
+        """The first-listed category any keyword of the text belongs to, with its evidence"""
+        pattern, scanned = self._scan(text)
+        best, best_rank = None, len(self.categories)
+        for match in pattern.finditer(scanned):
+            rank = self.rank(match.group())
+            if rank < best_rank:
+                best, best_rank = match, rank
+                if rank == 0:
+                    break
+        if best is None:
+            return Classification(UNKNOWN)
+        start, end = best.span()
+        return Classification(self.categories[best_rank], start, end, text[start:end])
+
+
+# Classifier for the shipped taxonomy, compiled on first use
+_default: Optional[RelationshipClassifier] = None
+
+
+def default_classifier() -> RelationshipClassifier:
+    global _default
+    if _default is None:
+        _default = RelationshipClassifier.load()
+    return _default
+
+
+def classify_scene_lines(store: CanonStore, classifier: RelationshipClassifier,
+                         sections=SCENE_SECTIONS) -> Iterator[Tuple[str, str, str, Classification]]:
+    """Yield (scene ID, section, line, classification) for every bullet of the given scene sections"""
+    for scene in store.entries['scene']:
+        if scene.error:
+            continue
+        for section in sections:
+            for line in scene.sections.bullets(section):
+                yield scene.id, section, line, classifier.classify(line)
+
+
+@click.command()
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--taxonomy', default=str(TAXONOMY_FILE), help='Relationship taxonomy YAML file')
+@click.option('--show-lines', is_flag=True, help='Print every classified line with its evidence')
+def main(repo_root: str, taxonomy: str, show_lines: bool):
+    """Classify the conflicts and reveals of every scene by relationship category"""
+    try:
+        classifier = RelationshipClassifier.load(Path(taxonomy))
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"ERROR: Failed to load taxonomy {taxonomy}: {e}")
+        exit(1)
+
+    store = CanonStore(Path(repo_root))
+    counts: Dict[str, Dict[str, int]] = {section: {} for section in SCENE_SECTIONS}
+    for scene_id, section, line, result in classify_scene_lines(store, classifier):
+        counts[section][result.category] = counts[section].get(result.category, 0) + 1
+        if show_lines:
+            evidence = f" [{result.evidence}]" if result.evidence else ""
+            print(f"{scene_id} {section}: {result.category}{evidence}: {line}")
+
+    for section, by_category in counts.items():
+        total = sum(by_category.values())
+        breakdown = ', '.join(f'{category}: {count}' for category, count in
+                              sorted(by_category.items(), key=lambda kv: (-kv[1], kv[0])))
+        print(f"{section}: {total} line(s){' - ' + breakdown if breakdown else ''}")
+    print(f"SUCCESS: Classified scene lines against {len(classifier.categories)} categories")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,40 +4,30 @@ Generate theme analysis from theme markdown files.
 This script analyzes themes and their connections to characters, locations, and events.
 """
 
-import frontmatter
+import sys
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Union
 import click
 
-def load_theme_data(theme_file: Path) -> Dict:
-    """Load theme data from markdown file"""
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "checks"))
+from canon_store import CanonEntry, CanonStore
+from build_manifest import PARSER_MODULES, BuildManifest, code_digest, listing_key
+from output_writer import GeneratedOutputs
+from id_index import scene_references
+import id_index
+
+# Files besides this one whose contents shape the analysis
+CODE_DEPENDENCIES = PARSER_MODULES + (id_index.__file__,)
+
+def load_theme_data(theme_entry: CanonEntry) -> Dict:
+    """Extract theme data from a parsed theme file"""
     try:
-        with open(theme_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
+        if theme_entry.error:
+            raise ValueError(theme_entry.error)
+        post = theme_entry
 
-        # Extract content from markdown body
         content = post.content
-        sections = {}
-
-        # Parse markdown sections
-        lines = content.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            if line.startswith('## '):
-                # Save previous section
-                if current_section and current_content:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                # Start new section
-                current_section = line[3:].strip()
-                current_content = []
-            elif current_section:
-                current_content.append(line)
-
-        # Save last section
-        if current_section and current_content:
-            sections[current_section] = '\n'.join(current_content).strip()
+        sections = post.sections
 
         return {
             'id': post.get('id', ''),
@@ -50,49 +40,74 @@ def load_theme_data(theme_file: Path) -> Dict:
             'content': content
         }
     except Exception as e:
-        print(f"ERROR: Failed to load {theme_file.name}: {e}")
+        print(f"ERROR: Failed to load {theme_entry.path.name}: {e}")
         return {}
 
-def load_character_data(char_id: str, repo_root: Path) -> Dict:
-    """Load character data from markdown file"""
-    char_file = repo_root / "canon" / "characters" / f"{char_id.lower().replace('-', '_')}.md"
-    if char_file.exists():
-        with open(char_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-            return {
-                'name': post.get('name', char_id),
-                'type': post.get('type', 'unknown'),
-                'role': post.get('role', '')
-            }
-    return {'name': char_id, 'type': 'unknown', 'role': ''}
-
-def analyze_theme_connections(theme_data: Dict, repo_root: Path) -> Dict:
-    """Analyze how themes connect to other elements"""
-    analysis = {
-        'character_connections': [],
-        'location_connections': [],
-        'event_connections': [],
-        'theme_relationships': []
-    }
-
-    # Extract examples and look for connections
-    examples = theme_data.get('examples', '')
-    if examples:
-        lines = examples.split('\n')
-        for line in lines:
-            if line.strip().startswith('- '):
-                example = line.strip()[2:]
-                # Look for character references
-                if 'C-' in example:
-                    char_id = example.split('C-')[1].split()[0] if 'C-' in example else ''
-                    if char_id:
-                        char_data = load_character_data(f"C-{char_id}", repo_root)
-                        analysis['character_connections'].append({
-                            'character': char_data['name'],
-                            'connection': example
-                        })
-
-    return analysis
+# Kinds whose files the theme index reads; the analysis is rebuilt when any of them changes
+INDEXED_KINDS = ('theme', 'scene', 'character', 'location', 'timeline')
+
+class ThemeIndex:
+    """Theme ID -> the scenes, characters, locations and timeline events it appears with,
+    built in one pass over the scenes and one over the timeline"""
+
+    def __init__(self, store: CanonStore):
+        self.scenes: Dict[str, List[CanonEntry]] = {}
+        # Theme ID -> entity ID -> number of the theme's scenes it appears in
+        self.characters: Dict[str, Dict[str, int]] = {}
+        self.locations: Dict[str, Dict[str, int]] = {}
+        self.episodes: Dict[str, Dict[str, int]] = {}
+        self.events: Dict[str, List[CanonEntry]] = {}
+        # Theme ID -> (earliest, latest) scene by episode and scene ID
+        self.first: Dict[str, CanonEntry] = {}
+        self.last: Dict[str, CanonEntry] = {}
+        self.scene_count = 0
+        self.all_episodes: Set[str] = set()
+
+        for scene in store.entries['scene']:
+            if scene.error:
+                continue
+            self.scene_count += 1
+            episode = str(scene.get('episode', ''))
+            self.all_episodes.add(episode)
+            references: Dict[str, List[str]] = {'character': [], 'location': [], 'theme': []}
+            for kind, entity_id in scene_references(scene):
+                references[kind].append(entity_id)
+            order = (episode, scene.id)
+            for theme_id in references['theme']:
+                self.scenes.setdefault(theme_id, []).append(scene)
+                episodes = self.episodes.setdefault(theme_id, {})
+                episodes[episode] = episodes.get(episode, 0) + 1
+                for kind, counts in (('character', self.characters), ('location', self.locations)):
+                    counts = counts.setdefault(theme_id, {})
+                    for entity_id in dict.fromkeys(references[kind]):
+                        counts[entity_id] = counts.get(entity_id, 0) + 1
+                first = self.first.get(theme_id)
+                if first is None or order < (str(first.get('episode', '')), first.id):
+                    self.first[theme_id] = scene
+                last = self.last.get(theme_id)
+                if last is None or order > (str(last.get('episode', '')), last.id):
+                    self.last[theme_id] = scene
+
+        # Timeline events reach a theme through the episodes they reference
+        events_by_episode: Dict[str, List[CanonEntry]] = {}
+        for event in store.entries['timeline']:
+            if not event.error and event.get('episode_reference'):
+                events_by_episode.setdefault(str(event.get('episode_reference')), []).append(event)
+        for theme_id, episodes in self.episodes.items():
+            self.events[theme_id] = [event for episode in sorted(episodes)
+                                     for event in events_by_episode.get(episode, [])]
+
+    def coverage(self, theme_id: str) -> float:
+        """Share of all scenes that carry the theme"""
+        return len(self.scenes.get(theme_id, [])) / self.scene_count if self.scene_count else 0.0
+
+def ranked(counts: Dict[str, int]) -> List[str]:
+    """IDs by descending count, then ID"""
+    return sorted(counts, key=lambda entity_id: (-counts[entity_id], entity_id))
+
+def display_name(entity_id: str, table: Dict[str, CanonEntry]) -> str:
+    entry = table.get(entity_id)
+    return entry.get('name', entity_id) if entry is not None else entity_id
 
 def generate_theme_summary(themes: List[Dict]) -> str:
     """Generate a summary of all themes"""
@@ -116,7 +131,10 @@ def generate_theme_summary(themes: List[Dict]) -> str:
 
     return summary
 
-def generate_theme_connections(themes: List[Dict], repo_root: Path) -> str:
+def scene_label(scene: CanonEntry) -> str:
+    return f"{scene.id} ({scene.get('title', 'Untitled Scene')})"
+
+def generate_theme_connections(themes: List[Dict], index: ThemeIndex, store: CanonStore) -> str:
     """Generate analysis of theme connections"""
     connections = "## Theme Connections\n\n"
 
@@ -125,18 +143,53 @@ def generate_theme_connections(themes: List[Dict], repo_root: Path) -> str:
             continue
 
         name = theme.get('name', 'Unknown Theme')
-        analysis = analyze_theme_connections(theme, repo_root)
+        theme_id = theme.get('id', '')
+        scenes = index.scenes.get(theme_id, [])
 
         connections += f"### {name}\n\n"
 
-        if analysis['character_connections']:
+        if not scenes:
+            connections += "*Not referenced by any scene*\n\n---\n\n"
+            continue
+
+        episodes = index.episodes[theme_id]
+        connections += f"- **Scenes**: {len(scenes)} ({index.coverage(theme_id):.0%} of all scenes)\n"
+        connections += (f"- **Episodes**: {len(episodes)} of {len(index.all_episodes)} - "
+                        f"{', '.join(f'{episode}: {count}' for episode, count in sorted(episodes.items()))}\n")
+        connections += f"- **First Appearance**: {scene_label(index.first[theme_id])}\n"
+        connections += f"- **Last Appearance**: {scene_label(index.last[theme_id])}\n\n"
+
+        characters = index.characters.get(theme_id, {})
+        if characters:
             connections += "**Character Connections**:\n"
-            for conn in analysis['character_connections']:
-                connections += f"- {conn['character']}: {conn['connection']}\n"
+            for char_id in ranked(characters):
+                connections += f"- {display_name(char_id, store.characters)}: {characters[char_id]} scene(s)\n"
+            connections += "\n"
+
+        locations = index.locations.get(theme_id, {})
+        if locations:
+            connections += "**Location Connections**:\n"
+            for loc_id in ranked(locations):
+                connections += f"- {display_name(loc_id, store.locations)}: {locations[loc_id]} scene(s)\n"
+            connections += "\n"
+
+        events = index.events.get(theme_id, [])
+        if events:
+            connections += "**Timeline Events** (in the same episodes):\n"
+            for event in events:
+                connections += f"- {event.get('title', event.id)} ({event.get('episode_reference')})\n"
             connections += "\n"
 
         connections += "---\n\n"
 
+    # Themes scenes use but that have no theme file
+    undefined = sorted(theme_id for theme_id in index.scenes if theme_id not in store.themes)
+    if undefined:
+        connections += "### Undefined Themes\n\n"
+        for theme_id in undefined:
+            connections += f"- {theme_id}: {len(index.scenes[theme_id])} scene(s)\n"
+        connections += "\n---\n\n"
+
     return connections
 
 def generate_theme_significance(themes: List[Dict]) -> str:
@@ -157,60 +210,80 @@ def generate_theme_significance(themes: List[Dict]) -> str:
 
     return significance
 
-def process_theme_files(repo_root: Path, output_dir: Path):
-    """Process all theme files and generate analysis"""
-    themes_dir = repo_root / "canon" / "themes"
+def analysis_file(output_dir: Path) -> Path:
+    """Return the theme analysis output path"""
+    return output_dir / "westworld_themes_analysis.md"
 
-    if not themes_dir.exists():
+def process_theme_files(store: CanonStore, output_dir: Path) -> Union[GeneratedOutputs, bool]:
+    """Process all theme files and generate analysis"""
+    if not store.directory('theme').exists():
         print("ERROR: Themes directory not found")
-        return
+        return False
 
     # Load all themes
-    theme_files = list(themes_dir.glob("*.md"))
     themes = []
 
-    for theme_file in theme_files:
-        if theme_file.name == "index.md":
-            continue
-        theme_data = load_theme_data(theme_file)
+    for theme_entry in store.entries['theme']:
+        theme_data = load_theme_data(theme_entry)
         if theme_data:
             themes.append(theme_data)
 
     print(f"SUCCESS: Loaded {len(themes)} themes")
 
+    # Index every scene and event once; the analysis depends on all of them
+    index = ThemeIndex(store)
+    sources = {listing_key(kind): store.listing_digest(kind) for kind in INDEXED_KINDS}
+
     # Generate different theme analyses
     theme_summary = generate_theme_summary(themes)
-    theme_connections = generate_theme_connections(themes, repo_root)
+    theme_connections = generate_theme_connections(themes, index, store)
     theme_significance = generate_theme_significance(themes)
 
     # Combine into full analysis
     full_analysis = theme_summary + "\n" + theme_connections + "\n" + theme_significance
 
     # Write output
-    output_file = output_dir / "westworld_themes_analysis.md"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_analysis)
+    output_file = analysis_file(output_dir)
+    outputs = GeneratedOutputs()
+    outputs.write_text(output_file, full_analysis)
+    outputs.record(output_file, sources)
 
     print(f"SUCCESS: Generated theme analysis in {output_file}")
+    return outputs
 
-@click.command()
-@click.option('--output-dir', default='generated/summaries', help='Output directory for theme analysis')
-@click.option('--repo-root', default='.', help='Repository root directory')
-def main(output_dir: str, repo_root: str):
-    """Generate theme analysis from theme markdown files"""
-    repo_path = Path(repo_root)
-    output_path = Path(output_dir)
-
+def analyze_themes(store: CanonStore, output_path: Path, manifest: Optional[BuildManifest] = None) -> bool:
+    """Generate the theme analysis for every theme in the store"""
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
 
     print("Generating theme analysis...\n")
 
-    process_theme_files(repo_path, output_path)
+    code = code_digest(__file__, *CODE_DEPENDENCIES)
+    if manifest is not None and manifest.is_fresh(analysis_file(output_path), store, code):
+        print("Up to date: theme analysis")
+    else:
+        built = process_theme_files(store, output_path)
+        if built is False:
+            return False
+        if manifest is not None:
+            for output_file, sources in built.sources.items():
+                manifest.record(Path(output_file), sources, code)
+            manifest.save()
 
     print(f"\nSUCCESS: Theme analysis generated in {output_path}")
+    return True
+
+@click.command()
+@click.option('--output-dir', default='generated/summaries', help='Output directory for theme analysis')
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--force', is_flag=True, help='Rebuild even if no theme or referenced character changed')
+def main(output_dir: str, repo_root: str, force: bool):
+    """Generate theme analysis from theme markdown files"""
+    store = CanonStore(Path(repo_root))
+    manifest = None if force else BuildManifest(Path(repo_root))
+    if not analyze_themes(store, Path(output_dir), manifest):
+        exit(1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -4,41 +4,29 @@ Generate timeline visualizations from timeline event markdown files.
 This script creates chronological summaries and visual representations of the Westworld timeline.
 """
 
-import frontmatter
+import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 import click
 from datetime import datetime
 
-def load_timeline_event(event_file: Path) -> Dict:
-    """Load timeline event data from markdown file"""
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "checks"))
+from canon_store import CanonEntry, CanonStore
+from build_manifest import PARSER_MODULES, BuildManifest, code_digest, listing_key
+from output_writer import GeneratedOutputs
+
+# Files besides this one whose contents shape the timeline
+CODE_DEPENDENCIES = PARSER_MODULES
+
+def load_timeline_event(event_entry: CanonEntry) -> Dict:
+    """Extract timeline event data from a parsed timeline file"""
     try:
-        with open(event_file, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
+        if event_entry.error:
+            raise ValueError(event_entry.error)
+        post = event_entry
 
-        # Extract content from markdown body
         content = post.content
-        sections = {}
-
-        # Parse markdown sections
-        lines = content.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            if line.startswith('## '):
-                # Save previous section
-                if current_section and current_content:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                # Start new section
-                current_section = line[3:].strip()
-                current_content = []
-            elif current_section:
-                current_content.append(line)
-
-        # Save last section
-        if current_section and current_content:
-            sections[current_section] = '\n'.join(current_content).strip()
+        sections = post.sections
 
         return {
             'id': post.get('id', ''),
@@ -52,7 +40,7 @@ def load_timeline_event(event_file: Path) -> Dict:
             'content': content
         }
     except Exception as e:
-        print(f"ERROR: Failed to load {event_file.name}: {e}")
+        print(f"ERROR: Failed to load {event_entry.path.name}: {e}")
         return {}
 
 def parse_date(date_str: str) -> int:
@@ -164,22 +152,22 @@ def generate_character_timeline(events: List[Dict]) -> str:
 
     return timeline
 
-def process_timeline_events(repo_root: Path, output_dir: Path):
-    """Process all timeline events and generate visualizations"""
-    timeline_dir = repo_root / "canon" / "timeline"
+def timeline_file(output_dir: Path) -> Path:
+    """Return the timeline visualization output path"""
+    return output_dir / "westworld_timeline.md"
 
-    if not timeline_dir.exists():
+def process_timeline_events(store: CanonStore, output_dir: Path) -> Union[GeneratedOutputs, bool]:
+    """Process all timeline events and generate visualizations"""
+    if not store.directory('timeline').exists():
         print("ERROR: Timeline directory not found")
-        return
+        return False
 
-    # Load all timeline events
-    event_files = list(timeline_dir.glob("*.md"))
+    # Load all timeline events; the output depends on the whole set
     events = []
+    sources = {listing_key('timeline'): store.listing_digest('timeline')}
 
-    for event_file in event_files:
-        if event_file.name == "index.md":
-            continue
-        event_data = load_timeline_event(event_file)
+    for event_entry in store.entries['timeline']:
+        event_data = load_timeline_event(event_entry)
         if event_data:
             events.append(event_data)
 
@@ -194,30 +182,47 @@ def process_timeline_events(repo_root: Path, output_dir: Path):
     full_timeline = timeline_summary + "\n" + period_breakdown + "\n" + character_timeline
 
     # Write output
-    output_file = output_dir / "westworld_timeline.md"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_timeline)
+    output_file = timeline_file(output_dir)
+    outputs = GeneratedOutputs()
+    outputs.write_text(output_file, full_timeline)
+    outputs.record(output_file, sources)
 
     print(f"SUCCESS: Generated timeline visualization in {output_file}")
+    return outputs
 
-@click.command()
-@click.option('--output-dir', default='generated/summaries', help='Output directory for timeline')
-@click.option('--repo-root', default='.', help='Repository root directory')
-def main(output_dir: str, repo_root: str):
-    """Generate timeline visualizations from timeline event files"""
-    repo_path = Path(repo_root)
-    output_path = Path(output_dir)
-
+def visualize_timeline(store: CanonStore, output_path: Path, manifest: Optional[BuildManifest] = None) -> bool:
+    """Generate the timeline visualizations for every event in the store"""
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
 
     print("Generating timeline visualizations...\n")
 
-    process_timeline_events(repo_path, output_path)
+    code = code_digest(__file__, *CODE_DEPENDENCIES)
+    if manifest is not None and manifest.is_fresh(timeline_file(output_path), store, code):
+        print("Up to date: timeline visualization")
+    else:
+        built = process_timeline_events(store, output_path)
+        if built is False:
+            return False
+        if manifest is not None:
+            for output_file, sources in built.sources.items():
+                manifest.record(Path(output_file), sources, code)
+            manifest.save()
 
     print(f"\nSUCCESS: Timeline visualizations generated in {output_path}")
+    return True
+
+@click.command()
+@click.option('--output-dir', default='generated/summaries', help='Output directory for timeline')
+@click.option('--repo-root', default='.', help='Repository root directory')
+@click.option('--force', is_flag=True, help='Rebuild even if no timeline event changed')
+def main(output_dir: str, repo_root: str, force: bool):
+    """Generate timeline visualizations from timeline event files"""
+    store = CanonStore(Path(repo_root))
+    manifest = None if force else BuildManifest(Path(repo_root))
+    if not visualize_timeline(store, Path(output_dir), manifest):
+        exit(1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -4,14 +4,167 @@ Master script to run all generation tasks.
 This script orchestrates the entire content generation pipeline.
 """
 
+import importlib
+import os
 import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import click
 
+GENERATE_DIR = Path(__file__).resolve().parent / "generate"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "checks"))
+sys.path.insert(0, str(GENERATE_DIR))
+from canon_store import CanonStore
+from scheduler import Task, run_tasks
+from build_manifest import BuildManifest, code_digest
+from output_writer import GeneratedOutputs
+from validate_markdown import MarkdownValidator
+from watcher import DirectoryWatcher
+
+NARRATIVES_DIR = Path("generated") / "narratives"
+SUMMARIES_DIR = Path("generated") / "summaries"
+
+# Each generator declares its in-process entry point and output directory, the
+# function that builds outputs and returns what they were built from, how its
+# output files are named, the entity kind it fans out over (one output per
+# file) if any with the glob matching those outputs, and the generators that
+# must finish before it starts
+GENERATORS = [
+    {
+        'script': "narrative_from_scene.py",
+        'entry_point': "generate_narratives",
+        'output_dir': NARRATIVES_DIR,
+        'build': "generate_narrative_batch",
+        'output_file': "narrative_file",
+        'fan_out': "scene",
+        'output_pattern': "NARRATIVE_PATTERN",
+        'after': [],
+    },
+    {
+        'script': "enrich_character_profile.py",
+        'entry_point': "enrich_profiles",
+        'output_dir': SUMMARIES_DIR,
+        'build': "enrich_profile_batch",
+        'output_file': "profile_file",
+        'fan_out': "character",
+        'output_pattern': "PROFILE_PATTERN",
+        'after': [],
+    },
+    {
+        'script': "timeline_visualization.py",
+        'entry_point': "visualize_timeline",
+        'output_dir': SUMMARIES_DIR,
+        'build': "process_timeline_events",
+        'output_file': "timeline_file",
+        'fan_out': None,
+        'after': [],
+    },
+    {
+        'script': "theme_analysis.py",
+        'entry_point': "analyze_themes",
+        'output_dir': SUMMARIES_DIR,
+        'build': "process_theme_files",
+        'output_file': "analysis_file",
+        'fan_out': None,
+        'after': [],
+    },
+]
+
+# Directories whose markdown files watch mode tracks
+WATCHED_DIRS = [Path("canon"), Path("story")]
+
+# Batches per worker for fanned-out generators; more batches balance load better
+BATCHES_PER_JOB = 4
+
+def build_generation_tasks(store: CanonStore, repo_path: Path, jobs: int,
+                           manifest: Optional[BuildManifest] = None) -> Dict[str, Tuple[List[Task], int, str]]:
+    """Turn the generator table into scheduler tasks for stale outputs, grouped by generator"""
+    groups: Dict[str, Tuple[List[Task], int, str]] = {}
+
+    for generator in GENERATORS:
+        script_name = generator['script']
+        module = importlib.import_module(Path(script_name).stem)
+        output_path = repo_path / generator['output_dir']
+        output_file = getattr(module, generator['output_file'])
+        build = getattr(module, generator['build'])
+        code = code_digest(module.__file__, *getattr(module, 'CODE_DEPENDENCIES', ()))
+        deps = [task.name for other in generator['after'] for task in groups[other][0]]
+        stem = Path(script_name).stem
+        kind = generator['fan_out']
+
+        if kind and store.directory(kind).exists():
+            # One output per file: rebuild only stale ones, in contiguous batches so order stays stable
+            output_path.mkdir(parents=True, exist_ok=True)
+            entries = store.entries[kind]
+            stale = [i for i in range(len(entries))
+                     if manifest is None or not manifest.is_fresh(output_file(entries[i], output_path), store, code)]
+            size = max(1, -(-len(stale) // (jobs * BATCHES_PER_JOB)))
+            tasks = [
+                Task(f"{stem}[{start}]", build, (output_path, stale[start:start + size]), deps)
+                for start in range(0, len(stale), size)
+            ]
+            groups[script_name] = (tasks, len(entries) - len(stale), code)
+        elif kind:
+            # Let the entry point report the missing source directory
+            groups[script_name] = ([Task(stem, getattr(module, generator['entry_point']), (output_path,), deps)], 0, code)
+        elif manifest is not None and manifest.is_fresh(output_file(output_path), store, code):
+            groups[script_name] = ([], 1, code)
+        else:
+            output_path.mkdir(parents=True, exist_ok=True)
+            groups[script_name] = ([Task(stem, build, (output_path,), deps)], 0, code)
+
+    return groups
+
+def run_generation_pipeline(store: CanonStore, repo_path: Path, jobs: int = 1, force: bool = False) -> int:
+    """Run every generator against a loaded corpus and return how many succeeded"""
+    manifest = BuildManifest(repo_path)
+    groups = build_generation_tasks(store, repo_path, jobs, None if force else manifest)
+    results = run_tasks([task for tasks, _, _ in groups.values() for task in tasks], store, jobs)
+
+    success_count = 0
+    for generator in GENERATORS:
+        script_name = generator['script']
+        tasks, fresh, code = groups[script_name]
+        print(f"Running {script_name}...")
+        if fresh:
+            print(f"Up to date: {fresh} output(s) with unchanged sources")
+        ok = True
+        outputs = GeneratedOutputs()
+        for task in tasks:
+            result = results[task.name]
+            if result.output:
+                print(result.output, end='')
+            if not result.ok:
+                ok = False
+                print(f"ERROR: {task.name} failed" + (f": {result.error}" if result.error else ""))
+            elif isinstance(result.value, GeneratedOutputs):
+                outputs.update(result.value)
+
+        kind = generator['fan_out']
+        if kind and store.directory(kind).exists():
+            # Outputs of files that were deleted from the corpus
+            module = importlib.import_module(Path(script_name).stem)
+            outputs.remove_orphans(store.entries[kind], getattr(module, generator['output_file']),
+                                   repo_path / generator['output_dir'], getattr(module, generator['output_pattern']))
+        for output_file, sources in outputs.sources.items():
+            manifest.record(Path(output_file), sources, code)
+        for output_file in outputs.deleted:
+            manifest.forget(Path(output_file))
+        print(f"Outputs: {outputs.summary()}")
+        if ok:
+            success_count += 1
+            print(f"SUCCESS: {script_name} completed successfully")
+        print()
+
+    manifest.save()
+    return success_count
+
 def run_generation_script(script_name: str, args: list = None) -> bool:
     """Run a generation script and return success status"""
-    script_path = Path(__file__).parent / "generate" / script_name
+    script_path = GENERATE_DIR / script_name
 
     if not script_path.exists():
         print(f"ERROR: Script not found: {script_path}")
@@ -40,7 +193,7 @@ def run_generation_script(script_name: str, args: list = None) -> bool:
         print(f"ERROR: Failed to run {script_name}: {e}")
         return False
 
-def generate_all_content(repo_root: str = "."):
+def generate_all_content(repo_root: str = ".", isolated: bool = False, jobs: int = 1, force: bool = False):
     """Generate all content using the generation pipeline"""
     print("Starting Westworld content generation pipeline...\n")
 
@@ -52,21 +205,23 @@ def generate_all_content(repo_root: str = "."):
 
     print(f"Repository root: {repo_path}\n")
 
-    # Run all generation scripts
-    scripts_to_run = [
-        ("narrative_from_scene.py", []),
-        ("enrich_character_profile.py", []),
-        ("timeline_visualization.py", []),
-        ("theme_analysis.py", [])
-    ]
-
     success_count = 0
-    total_scripts = len(scripts_to_run)
+    total_scripts = len(GENERATORS)
 
-    for script_name, args in scripts_to_run:
-        if run_generation_script(script_name, args):
-            success_count += 1
-        print()
+    if isolated:
+        # One interpreter per generator, each re-reading the corpus
+        for generator in GENERATORS:
+            script_name = generator['script']
+            args = ["--repo-root", str(repo_path), "--output-dir", str(repo_path / generator['output_dir'])]
+            if force:
+                args.append("--force")
+            if run_generation_script(script_name, args):
+                success_count += 1
+            print()
+    else:
+        # Parse the corpus once and share it with every generator
+        store = CanonStore(repo_path, jobs=jobs)
+        success_count = run_generation_pipeline(store, repo_path, jobs, force)
 
     # Summary
     print("=" * 50)
@@ -84,11 +239,52 @@ def generate_all_content(repo_root: str = "."):
         print("Check the error messages above for details")
         return False
 
+def watch_content(repo_root: str = ".", jobs: int = 1, interval: float = 0.2, debounce: float = 0.3):
+    """Keep the corpus loaded and rebuild affected outputs whenever sources change"""
+    repo_path = Path(repo_root).resolve()
+    if not repo_path.exists():
+        print(f"ERROR: Repository root not found: {repo_path}")
+        return False
+
+    store = CanonStore(repo_path, jobs=jobs)
+    run_generation_pipeline(store, repo_path, jobs)
+
+    watcher = DirectoryWatcher([repo_path / d for d in WATCHED_DIRS], interval)
+    print(f"Watching {', '.join(f'{d}/' for d in map(str, WATCHED_DIRS))} for changes (Ctrl+C to stop)...\n")
+    try:
+        while True:
+            changed = watcher.wait_for_changes(debounce)
+            start = time.perf_counter()
+            print(f"Detected {len(changed)} changed file(s)")
+
+            updated = store.refresh(changed)
+            validator = MarkdownValidator(repo_path, store)
+            validator.validate_entries(updated)
+            for error in validator.errors:
+                print(f"  ERROR: {error}")
+            for warning in validator.warnings:
+                print(f"  WARNING: {warning}")
+
+            run_generation_pipeline(store, repo_path, jobs)
+            print(f"Rebuilt in {time.perf_counter() - start:.2f}s\n")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    return True
+
 @click.command()
 @click.option('--repo-root', default='.', help='Repository root directory')
-def main(repo_root: str):
+@click.option('--isolated', is_flag=True, help='Run each generator in its own Python subprocess')
+@click.option('--jobs', '-j', default=1, type=int, help='Worker processes for generation (0 = one per CPU)')
+@click.option('--force', is_flag=True, help='Rebuild every output even if its sources are unchanged')
+@click.option('--watch', is_flag=True, help='Keep running and rebuild affected outputs when canon/ or story/ change')
+@click.option('--poll-interval', default=0.2, type=float, help='Seconds between change checks in watch mode')
+def main(repo_root: str, isolated: bool, jobs: int, force: bool, watch: bool, poll_interval: float):
     """Run the complete Westworld content generation pipeline"""
-    success = generate_all_content(repo_root)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if watch:
+        sys.exit(0 if watch_content(repo_root, jobs, poll_interval) else 1)
+    success = generate_all_content(repo_root, isolated, jobs, force)
 
     if success:
         print("\nSUCCESS: Content generation pipeline completed successfully!")
@@ -8,6 +8,9 @@ import yaml
 from pathlib import Path
 import sys
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "generate"))
+from output_writer import GeneratedOutputs
+
 def load_yaml_file(file_path):
     """Load and parse a YAML file."""
     try:
@@ -84,7 +87,7 @@ def generate_narrative_content(scene, characters):
 
     return '\n'.join(content)
 
-def generate_narrative_index(narratives_dir):
+def generate_narrative_index(narratives_dir, outputs):
     """Generate index of all narratives."""
     output = Path('narratives.md')
 
@@ -133,8 +136,7 @@ def generate_narrative_index(narratives_dir):
         "*Narratives are generated using structured scene data and AI assistance to create coherent story content.*"
     ])
 
-    with open(output, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(content) + '\n')
+    outputs.write_text(output, '\n'.join(content) + '\n')
 
 def generate_narratives():
     """Main function to generate all narratives."""
@@ -144,6 +146,8 @@ def generate_narratives():
     # Create narratives directory
     narratives_dir.mkdir(exist_ok=True)
 
+    outputs = GeneratedOutputs()
+
     # Load character data
     characters = load_characters()
     print("SUCCESS: Loaded character data")
@@ -156,6 +160,7 @@ def generate_narratives():
 
     print(f"SUCCESS: Found {len(scene_files)} scene files")
 
+    unreadable = 0
     for scene_file in scene_files:
         if scene_file.name == 'TEMPLATE.yml':
             continue
@@ -165,6 +170,7 @@ def generate_narratives():
         # Load scene data
         scene = load_yaml_file(scene_file)
         if not scene:
+            unreadable += 1
             continue
 
         # Generate narrative content
@@ -184,13 +190,19 @@ def generate_narratives():
             narrative_content
         ]
 
-        with open(narrative_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(front_matter))
+        outputs.write_text(narrative_file, '\n'.join(front_matter))
+        outputs.record(narrative_file, {})
 
         print(f"SUCCESS: Generated {narrative_file.name}")
 
+    # Remove narratives of scenes that no longer exist (unless a scene could not be read)
+    if not unreadable:
+        keep = [*map(Path, outputs.sources), narratives_dir / 'index.md']
+        for removed in outputs.remove_stale(narratives_dir, '*.md', keep):
+            print(f"SUCCESS: Removed stale {Path(removed).name}")
+
     # Generate narrative index
-    generate_narrative_index(narratives_dir)
+    generate_narrative_index(narratives_dir, outputs)
     print("SUCCESS: Generated narrative index")
 
     # Create narratives index file
@@ -216,10 +228,10 @@ def generate_narratives():
         # Link to directory to support pretty permalinks
         index_content.append(f"- [{scene_id}]({scene_id}/)")
 
-    with open(narratives_index, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(index_content) + '\n')
+    outputs.write_text(narratives_index, '\n'.join(index_content) + '\n')
 
     print("SUCCESS: Generated narratives index file")
+    print(f"SUCCESS: Site content: {outputs.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware task scheduler for the generation pipeline.
+Tasks declare which tasks they depend on; ready tasks run on a process pool
+and their captured output is reported in declaration order, so logs and
+results are the same whatever the number of workers.
+"""
+
+import contextlib
+import io
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "checks"))
+from canon_store import pool_context
+
+
+class Task:
+    """A unit of work: func(store, *args), run after every task in deps"""
+
+    __slots__ = ('name', 'func', 'args', 'deps')
+
+    def __init__(self, name: str, func: Callable, args: tuple = (), deps: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = tuple(deps)
+
+
+class TaskResult:
+    """Outcome of a task: success flag, captured stdout, return value and error"""
+
+    __slots__ = ('ok', 'output', 'value', 'error')
+
+    def __init__(self, ok: bool, output: str = '', value=None, error: Optional[str] = None):
+        self.ok = ok
+        self.output = output
+        self.value = value
+        self.error = error
+
+
+# Corpus shared with pool workers; installed once per worker process
+_STORE = None
+
+
+def _install_store(store):
+    global _STORE
+    _STORE = store
+
+
+def _run(func: Callable, args: tuple, store) -> TaskResult:
+    """Run a task, capturing whatever it prints"""
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            value = func(store, *args)
+        return TaskResult(value is not False, buffer.getvalue(), value)
+    except Exception as e:
+        return TaskResult(False, buffer.getvalue(), error=str(e))
+
+
+def _run_in_worker(func: Callable, args: tuple) -> TaskResult:
+    return _run(func, args, _STORE)
+
+
+def order_tasks(tasks: List[Task]) -> List[Task]:
+    """Topologically sort tasks, keeping declaration order between independent tasks"""
+    by_name = {task.name: task for task in tasks}
+    if len(by_name) != len(tasks):
+        raise ValueError("Duplicate task names in pipeline")
+
+    for task in tasks:
+        for dep in task.deps:
+            if dep not in by_name:
+                raise ValueError(f"Task {task.name} depends on unknown task {dep}")
+
+    ordered = []
+    done = set()
+    pending = list(tasks)
+    while pending:
+        ready = [task for task in pending if all(dep in done for dep in task.deps)]
+        if not ready:
+            cycle = ', '.join(task.name for task in pending)
+            raise ValueError(f"Dependency cycle between tasks: {cycle}")
+        for task in ready:
+            ordered.append(task)
+            done.add(task.name)
+        pending = [task for task in pending if task.name not in done]
+    return ordered
+
+
+def run_tasks(tasks: List[Task], store, jobs: int = 1) -> Dict[str, TaskResult]:
+    """Run tasks respecting dependencies, on up to `jobs` worker processes"""
+    ordered = order_tasks(tasks)
+    results: Dict[str, TaskResult] = {}
+
+    def blocked(task: Task) -> Optional[str]:
+        failed = [dep for dep in task.deps if not results[dep].ok]
+        return f"dependency failed: {', '.join(failed)}" if failed else None
+
+    # A pool is not worth starting for a single task (e.g. a one-file rebuild)
+    jobs = min(jobs, len(tasks))
+    if jobs <= 1:
+        for task in ordered:
+            reason = blocked(task)
+            results[task.name] = TaskResult(False, error=reason) if reason else _run(task.func, task.args, store)
+        return {task.name: results[task.name] for task in tasks}
+
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=pool_context(),
+                             initializer=_install_store, initargs=(store,)) as pool:
+        running = {}
+        waiting = list(ordered)
+        while waiting or running:
+            # Submit every task whose dependencies have finished
+            still_waiting = []
+            for task in waiting:
+                if not all(dep in results for dep in task.deps):
+                    still_waiting.append(task)
+                    continue
+                reason = blocked(task)
+                if reason:
+                    results[task.name] = TaskResult(False, error=reason)
+                else:
+                    running[pool.submit(_run_in_worker, task.func, task.args)] = task
+            waiting = still_waiting
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = running.pop(future)
+                try:
+                    results[task.name] = future.result()
+                except Exception as e:
+                    results[task.name] = TaskResult(False, error=str(e))
+
+    return {task.name: results[task.name] for task in tasks}
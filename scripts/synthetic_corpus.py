@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic Westworld corpus for scale testing.
+Writes characters, locations, themes, timeline events and scenes in the same
+layout and format as the real canon (canon/*/ and story/scenes/<episode>/),
+with valid cross-references, so validators and generators can be run against
+corpora of any size. Output is deterministic for a given seed.
+"""
+
+import random
+import sys
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List
+import click
+import yaml
+
+SYLLABLES = ["ar", "bel", "cor", "da", "el", "fen", "gar", "hol", "is", "jor", "ka", "lor",
+             "mar", "nor", "os", "per", "quin", "ros", "sel", "tor", "ul", "vin", "wes", "yor"]
+
+WORDS = ["memory", "loop", "maze", "host", "guest", "narrative", "dream", "code", "frontier",
+         "silence", "violence", "awakening", "reverie", "truth", "control", "freedom", "river",
+         "town", "ranch", "mesa", "train", "church", "gun", "song", "letter", "photograph"]
+
+VERBS = ["questions", "remembers", "follows", "confronts", "escapes", "protects", "betrays",
+         "discovers", "rewrites", "abandons", "searches for", "returns to"]
+
+EMOTIONS = ["Confused", "Fearful", "Determined", "Hopeful", "Angry", "Grieving", "Curious", "Calm"]
+
+RELATIONS = ["Love interest", "Creator", "Ally", "Rival", "Sibling", "Mentor", "Enemy", "Friend"]
+
+REGIONS = ["Central Valley", "Northern Territory", "Eastern Territories", "Below Park", "Sweetwater Outskirts"]
+
+PERIODS = [("Pre-Park", 2038), ("Early Years", 2042), ("Present Day", 2052)]
+
+EPISODES_PER_SEASON = 10
+
+# Scene IDs carry a three-digit number within their episode
+MAX_SCENES_PER_EPISODE = 999
+
+
+def letter_code(index: int, width: int = 4) -> str:
+    """Map an index to a fixed-width letters-only code (0 -> AAAA)"""
+    letters = []
+    for _ in range(width):
+        index, rem = divmod(index, 26)
+        letters.append(chr(ord('A') + rem))
+    return ''.join(reversed(letters))
+
+
+def proper_name(index: int) -> str:
+    """A unique pronounceable name for an index"""
+    parts = []
+    index += len(SYLLABLES)
+    while index:
+        index, rem = divmod(index, len(SYLLABLES))
+        parts.append(SYLLABLES[rem])
+    return ''.join(reversed(parts)).capitalize()
+
+
+def episode_id(index: int) -> str:
+    season, episode = divmod(index, EPISODES_PER_SEASON)
+    return f"S{season + 1:02d}E{episode + 1:02d}"
+
+
+class CorpusGenerator:
+    """Builds a consistent synthetic corpus and writes it under a root directory"""
+
+    def __init__(self, output_root: Path, seed: int = 0, section_size: int = 3):
+        self.root = Path(output_root)
+        self.rng = random.Random(seed)
+        self.section_size = section_size
+        self.files_written = 0
+
+    def sentence(self) -> str:
+        words = self.rng.sample(WORDS, 3)
+        return f"The {words[0]} {self.rng.choice(VERBS)} the {words[1]} near the {words[2]}"
+
+    def paragraph(self) -> str:
+        return '. '.join(self.sentence() for _ in range(self.rng.randint(1, self.section_size))) + '.'
+
+    def bullets(self, make=None) -> str:
+        make = make or self.sentence
+        count = self.rng.randint(1, self.section_size * 2 - 1)
+        return '\n'.join(f"- {make()}" for _ in range(count))
+
+    def write(self, path: Path, frontmatter: Dict, title: str, sections: List[tuple]):
+        """Write a markdown file in the canon format: frontmatter, title, `## ` sections"""
+        lines = ["---"]
+        for key, value in frontmatter.items():
+            if isinstance(value, list):
+                lines.append(f"{key}:")
+                lines.extend(f"  - {item}" for item in value)
+            else:
+                lines.append(f"{key}: {value}")
+        lines += ["---", "", f"# {title}", ""]
+        for heading, body in sections:
+            lines += [f"## {heading}", body, ""]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(lines), encoding='utf-8')
+        self.files_written += 1
+
+    def write_index(self, directory: Path, title: str, items: List[str]):
+        (directory / "index.md").write_text(f"# {title}\n\n" + ''.join(f"{item}\n" for item in items),
+                                            encoding='utf-8')
+        self.files_written += 1
+
+    def generate(self, characters: int, locations: int, themes: int, events: int, episodes: int, scenes: int):
+        episode_ids = [episode_id(i) for i in range(episodes)]
+        char_ids = [f"C-{letter_code(i)}" for i in range(characters)]
+        char_names = [f"{proper_name(i)} {proper_name(i + characters)}" for i in range(characters)]
+        loc_ids = [f"L-{letter_code(i)}" for i in range(locations)]
+        theme_ids = [f"T-{letter_code(i)}" for i in range(themes)]
+
+        # Episode each character first appears in; someone is on screen from the first episode
+        first_seen = [0 if i == 0 else self.rng.randrange(episodes) for i in range(characters)]
+
+        self.generate_characters(char_ids, char_names, [episode_ids[e] for e in first_seen])
+        self.generate_locations(loc_ids)
+        self.generate_themes(theme_ids)
+        self.generate_timeline(events, char_ids, episode_ids)
+        self.generate_scenes(scenes, episode_ids, char_ids, first_seen, loc_ids, theme_ids)
+
+    def generate_characters(self, char_ids: List[str], names: List[str], first_appearances: List[str]):
+        directory = self.root / "canon" / "characters"
+        hosts, humans = [], []
+        for i, (char_id, name, first_appearance) in enumerate(zip(char_ids, names, first_appearances)):
+            char_type = self.rng.choice(["host", "human"])
+            role = f"{self.rng.choice(['Rancher', 'Outlaw', 'Engineer', 'Guest', 'Sheriff'])} of the {self.rng.choice(WORDS)}"
+            others = self.rng.sample(range(len(names)), min(len(names), self.rng.randint(1, 3)))
+            relationships = '\n'.join(f"- **{names[j].split()[0].upper()}**: {self.rng.choice(RELATIONS)}"
+                                      for j in others if j != i) or "- None"
+            filename = f"{char_id.lower().replace('-', '_')}.md"
+            self.write(directory / filename, {
+                'id': char_id,
+                'name': name,
+                'type': char_type,
+                'role': role,
+                'status': "deceased" if self.rng.random() < 0.1 else "active",
+                'first_appearance': first_appearance,
+            }, name, [
+                ("Overview", role),
+                ("Traits", self.bullets()),
+                ("Goals", self.bullets()),
+                ("Relationships", relationships),
+                ("Backstory", self.paragraph()),
+                ("Narrative Function", self.sentence()),
+            ])
+            (hosts if char_type == "host" else humans).append(f"- [{name}]({filename})")
+        (directory / "index.md").write_text(
+            "# Characters\n\n## Hosts\n\n" + ''.join(f"{h}\n" for h in hosts)
+            + "\n## Humans\n\n" + ''.join(f"{h}\n" for h in humans), encoding='utf-8')
+        self.files_written += 1
+
+    def generate_locations(self, loc_ids: List[str]):
+        directory = self.root / "canon" / "locations"
+        # A ring keeps every location reachable; extra random links add shortcuts
+        links = {loc_id: set() for loc_id in loc_ids}
+        for i, loc_id in enumerate(loc_ids):
+            if len(loc_ids) > 1:
+                links[loc_id].add(loc_ids[(i + 1) % len(loc_ids)])
+            if len(loc_ids) > 3 and self.rng.random() < 0.3:
+                links[loc_id].add(self.rng.choice(loc_ids))
+            links[loc_id].discard(loc_id)
+
+        world = []
+        index = []
+        for i, loc_id in enumerate(loc_ids):
+            name = f"{proper_name(i)} {self.rng.choice(['Ridge', 'Creek', 'Hub', 'Station', 'Flats'])}"
+            region = self.rng.choice(REGIONS)
+            significance = self.sentence()
+            connected = sorted(links[loc_id])
+            filename = f"{loc_id.lower().replace('-', '_')}.md"
+            self.write(directory / filename, {
+                'id': loc_id,
+                'name': name,
+                'region': region,
+                'significance': significance,
+            }, name, [
+                ("Overview", self.paragraph()),
+                ("Region", region),
+                ("Significance", significance),
+                ("Connected Locations", '\n'.join(f"- {c}" for c in connected)),
+            ])
+            world.append({'id': loc_id, 'name': name, 'description': self.sentence(), 'region': region,
+                          'significance': significance, 'connected_to': connected})
+            index.append(f"- [{name}]({filename})")
+        self.write_index(directory, "Locations", index)
+
+        world_file = self.root / "canon" / "world.yml"
+        with open(world_file, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({'world': {'name': "Westworld", 'type': "Theme Park"}, 'locations': world},
+                           f, sort_keys=False, width=1000)
+        self.files_written += 1
+
+    def generate_themes(self, theme_ids: List[str]):
+        directory = self.root / "canon" / "themes"
+        index = []
+        for i, theme_id in enumerate(theme_ids):
+            name = f"{self.rng.choice(WORDS).capitalize()} and {proper_name(i)}"
+            filename = f"{theme_id.lower().replace('-', '_')}.md"
+            self.write(directory / filename, {'id': theme_id, 'name': name}, name, [
+                ("Description", self.paragraph()),
+                ("Examples", self.bullets()),
+                ("Significance", self.paragraph()),
+            ])
+            index.append(f"- [{name}]({filename})")
+        self.write_index(directory, "Themes", index)
+
+    def generate_timeline(self, events: int, char_ids: List[str], episode_ids: List[str]):
+        directory = self.root / "canon" / "timeline"
+        index = []
+        for i in range(events):
+            event_id = f"TE-{letter_code(i)}-001"
+            title = f"The {self.rng.choice(WORDS).capitalize()} of {proper_name(i)}"
+            period, year = self.rng.choice(PERIODS)
+            involved = self.rng.sample(char_ids, min(len(char_ids), self.rng.randint(1, 4)))
+            reference = self.rng.choice(episode_ids)
+            filename = f"{event_id.lower().replace('-', '_')}.md"
+            self.write(directory / filename, {
+                'id': event_id,
+                'title': title,
+                'date': year,
+                'period': period,
+                'episode_reference': reference,
+            }, title, [
+                ("Overview", self.paragraph()),
+                ("Date", str(year)),
+                ("Period", period),
+                ("Characters Involved", '\n'.join(f"- {c}" for c in involved)),
+                ("Significance", self.paragraph()),
+                ("Episode Reference", reference),
+            ])
+            index.append(f"- [{title}]({filename}) - {year}")
+        self.write_index(directory, "Timeline Events", index)
+
+    def generate_scenes(self, scenes: int, episode_ids: List[str], char_ids: List[str], first_seen: List[int],
+                        loc_ids: List[str], theme_ids: List[str]):
+        # Spread scenes as evenly as possible over the episodes
+        per_episode, extra = divmod(scenes, len(episode_ids))
+        # Characters sorted by first appearance, so each episode's cast is a prefix
+        cast = sorted(range(len(char_ids)), key=first_seen.__getitem__)
+        debut = sorted(first_seen)
+        for e, episode in enumerate(episode_ids):
+            available = [char_ids[i] for i in cast[:bisect_right(debut, e)]]
+            directory = self.root / "story" / "scenes" / episode.lower()
+            index = []
+            for n in range(1, per_episode + (1 if e < extra else 0) + 1):
+                scene_id = f"{episode}-{n:03d}"
+                title = f"{proper_name(n)} {self.rng.choice(VERBS)} the {self.rng.choice(WORDS)}"
+                themes = self.rng.sample(theme_ids, min(len(theme_ids), self.rng.randint(1, 3)))
+                characters = self.rng.sample(available, min(len(available), self.rng.randint(1, 5)))
+                filename = f"{episode.lower()}_{n:03d}.md"
+                self.write(directory / filename, {
+                    'id': scene_id,
+                    'episode': episode,
+                    'title': title,
+                    'location': self.rng.choice(loc_ids),
+                    'timestamp': self.rng.choice(["Morning", "Afternoon", "Night"]),
+                    'themes': themes,
+                }, title, [
+                    ("Synopsis", self.paragraph()),
+                    ("Characters", '\n'.join(f"- {c}" for c in characters)),
+                    ("Themes", '\n'.join(f"- {t}" for t in themes)),
+                    ("Reveals", self.bullets()),
+                    ("Conflicts", self.bullets()),
+                    ("Key Dialogue", self.bullets(lambda: f'"{self.sentence()}."')),
+                    ("Emotions", self.bullets(lambda: self.rng.choice(EMOTIONS))),
+                    ("Actions", self.bullets()),
+                    ("Connections", self.bullets()),
+                ])
+                index.append(f"- [{title}]({filename}) - {scene_id}")
+            if index:
+                self.write_index(directory, f"Season {int(episode[1:3])} Episode {int(episode[4:])} Scenes", index)
+
+
+@click.command()
+@click.option('--output-dir', required=True, help='Directory to create the corpus in')
+@click.option('--characters', default=100, type=int, help='Number of characters')
+@click.option('--locations', default=50, type=int, help='Number of locations')
+@click.option('--themes', default=20, type=int, help='Number of themes')
+@click.option('--events', default=200, type=int, help='Number of timeline events')
+@click.option('--episodes', default=10, type=int, help='Number of episodes')
+@click.option('--scenes', default=1000, type=int, help='Total number of scenes, spread over the episodes')
+@click.option('--section-size', default=3, type=int, help='Typical number of sentences or bullets per section')
+@click.option('--seed', default=0, type=int, help='Random seed; the same seed gives the same corpus')
+@click.option('--overwrite', is_flag=True, help='Allow writing into a non-empty directory')
+def main(output_dir: str, characters: int, locations: int, themes: int, events: int, episodes: int,
+         scenes: int, section_size: int, seed: int, overwrite: bool):
+    """Generate a synthetic corpus in the canon/ and story/scenes/ layout"""
+    output_root = Path(output_dir)
+    if output_root.exists() and any(output_root.iterdir()) and not overwrite:
+        print(f"ERROR: {output_root} is not empty (pass --overwrite to write into it anyway)")
+        sys.exit(1)
+    if min(characters, locations, themes, episodes) < 1 or min(events, scenes) < 0 or section_size < 1:
+        print("ERROR: Need at least one character, location, theme and episode")
+        sys.exit(1)
+    if scenes > episodes * MAX_SCENES_PER_EPISODE:
+        print(f"ERROR: At most {MAX_SCENES_PER_EPISODE} scenes fit in an episode; use more episodes")
+        sys.exit(1)
+
+    generator = CorpusGenerator(output_root, seed, section_size)
+    generator.generate(characters, locations, themes, events, episodes, scenes)
+    print(f"SUCCESS: Wrote {generator.files_written} files to {output_root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Polling file watcher for the canon and story directories.
+Keeps a snapshot of every markdown file's mtime and size, reports files that
+were added, modified or removed, and folds bursts of edits (a git checkout,
+an editor saving several files) into a single batch.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Set, Tuple
+
+
+def snapshot(roots: Iterable[Path]) -> Dict[Path, Tuple[int, int]]:
+    """Map every markdown file under the roots to its (mtime_ns, size)"""
+    files = {}
+    stack = [Path(root) for root in roots]
+    while stack:
+        directory = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with it:
+            for item in it:
+                if item.is_dir(follow_symlinks=False):
+                    stack.append(Path(item.path))
+                elif item.name.endswith('.md'):
+                    # A file deleted mid-scan is simply absent from this snapshot
+                    try:
+                        st = item.stat()
+                    except FileNotFoundError:
+                        continue
+                    files[Path(item.path)] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+class DirectoryWatcher:
+    """Detect changed markdown files by polling directory snapshots"""
+
+    def __init__(self, roots: Iterable[Path], interval: float = 0.2):
+        self.roots = [Path(root) for root in roots]
+        self.interval = interval
+        self.state = snapshot(self.roots)
+
+    def poll(self) -> Set[Path]:
+        """Return files added, modified or removed since the last poll"""
+        current = snapshot(self.roots)
+        changed = {path for path, stat in current.items() if self.state.get(path) != stat}
+        changed.update(path for path in self.state if path not in current)
+        self.state = current
+        return changed
+
+    def wait_for_changes(self, debounce: float = 0.3) -> Set[Path]:
+        """Block until files change, then until they stay quiet for `debounce` seconds"""
+        changed = set()
+        while not changed:
+            time.sleep(self.interval)
+            changed = self.poll()
+
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < debounce:
+            time.sleep(self.interval)
+            more = self.poll()
+            if more:
+                changed |= more
+                quiet_since = time.monotonic()
+        return changed
@@ -0,0 +1,88 @@
+"""
+`continuity.py --since` must report exactly what a full run reports for the
+files it re-checks. Each test copies the corpus into a fresh git repository,
+makes a change on top of the commit and compares the two runs.
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def git(repo: Path, *args: str):
+    subprocess.run(['git', '-C', str(repo), *args], check=True, capture_output=True)
+
+
+def commit(repo: Path, message: str):
+    git(repo, 'add', '.')
+    git(repo, '-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', message)
+
+
+def findings(repo: Path, *args: str):
+    """Messages of every finding a continuity run reports"""
+    result = subprocess.run([sys.executable, 'checks/continuity.py', '--format', 'ndjson', *args],
+                            cwd=repo, capture_output=True, text=True)
+    records = [json.loads(line) for line in result.stdout.splitlines() if line.startswith('{')]
+    assert any(record['type'] == 'summary' for record in records), result.stdout + result.stderr
+    return sorted(record['message'] for record in records if record['type'] == 'finding')
+
+
+@pytest.fixture
+def corpus(tmp_path: Path) -> Path:
+    """A committed copy of the corpus and the checks"""
+    repo = tmp_path / 'repo'
+    for name in ('canon', 'story', 'checks'):
+        shutil.copytree(REPO_ROOT / name, repo / name, ignore=shutil.ignore_patterns('__pycache__'))
+    git(repo, 'init', '-q')
+    commit(repo, 'corpus')
+    return repo
+
+
+def assert_since_matches_full(repo: Path):
+    full = findings(repo)
+    assert full, "the change should produce findings"
+    assert findings(repo, '--since', 'HEAD') == full
+
+
+def test_added_death_event(corpus: Path):
+    (corpus / 'canon' / 'timeline' / 'te_peter_death_001.md').write_text(
+        "---\nid: TE-PETER-DEATH-001\ntitle: Peter Abernathy's Death\ndate: 2040\n"
+        "period: Pre-Park\ndeath_episode: S00E01\n---\n\n# Peter Abernathy's Death\n\n"
+        "## Characters Involved\n- C-PETER\n", encoding='utf-8')
+    assert_since_matches_full(corpus)
+
+
+def test_moved_death_event(corpus: Path):
+    event = corpus / 'canon' / 'timeline' / 'te_arnold_death_001.md'
+    event.write_text(event.read_text(encoding='utf-8').replace('date: 2039', 'date: 1990'), encoding='utf-8')
+    assert_since_matches_full(corpus)
+
+
+def test_changed_first_appearance(corpus: Path):
+    character = corpus / 'canon' / 'characters' / 'c_peter.md'
+    text = character.read_text(encoding='utf-8')
+    assert 'first_appearance:' in text
+    lines = [('first_appearance: S02E01' if line.startswith('first_appearance:') else line)
+             for line in text.split('\n')]
+    character.write_text('\n'.join(lines), encoding='utf-8')
+    assert_since_matches_full(corpus)
+
+
+def test_removed_world_link(corpus: Path):
+    # Dolores moves from the ranch to Sweetwater between the committed scenes
+    scene = corpus / 'story' / 'scenes' / 's01e01' / 's01e01_003.md'
+    scene.write_text(scene.read_text(encoding='utf-8').replace('location: L-RANCH', 'location: L-SWEETWATER'),
+                     encoding='utf-8')
+    commit(corpus, 'move')
+    assert findings(corpus) == []
+
+    # Only world.yml changes: the ranch is no longer linked to Sweetwater
+    world = corpus / 'canon' / 'world.yml'
+    world.write_text(world.read_text(encoding='utf-8').replace('["L-RANCH", ', '['), encoding='utf-8')
+    assert_since_matches_full(corpus)
@@ -0,0 +1,85 @@
+"""
+LocationGraph.update patches the shortest-hop table instead of rebuilding it.
+After every random change to the links the table must equal a fresh
+breadth-first search over the same links.
+"""
+
+import random
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "checks"))
+from reachability import LocationGraph
+
+
+def all_pairs_hops(connections: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+    """Shortest hops between every pair of locations, treating links as two-way"""
+    adjacency = {node: set() for node in connections}
+    for a, linked in connections.items():
+        for b in linked:
+            if a != b:
+                adjacency.setdefault(a, set()).add(b)
+                adjacency.setdefault(b, set()).add(a)
+    hops = {}
+    for source in adjacency:
+        row = {source: 0}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbour in adjacency[node]:
+                if neighbour not in row:
+                    row[neighbour] = row[node] + 1
+                    queue.append(neighbour)
+        hops[source] = row
+    return hops
+
+
+def random_change(rng: random.Random, connections: Dict[str, List[str]], pool: List[str]):
+    """Add or drop a link, or add or drop a location"""
+    action = rng.random()
+    if action < 0.45:
+        a, b = rng.sample(pool, 2)
+        connections.setdefault(a, []).append(b)
+    elif action < 0.8:
+        linked = [(a, b) for a, targets in connections.items() for b in targets]
+        if linked:
+            a, b = rng.choice(linked)
+            connections[a].remove(b)
+    elif action < 0.9:
+        connections.setdefault(rng.choice(pool), [])
+    elif connections:
+        dropped = rng.choice(sorted(connections))
+        del connections[dropped]
+        for targets in connections.values():
+            while dropped in targets:
+                targets.remove(dropped)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_updates_match_bfs(seed: int):
+    rng = random.Random(seed)
+    pool = [f"L-{i}" for i in range(rng.randint(4, 25))]
+    connections: Dict[str, List[str]] = {}
+    graph = LocationGraph()
+    for _ in range(60):
+        random_change(rng, connections, pool)
+        graph.update({key: list(value) for key, value in connections.items()})
+        assert graph.hops == all_pairs_hops(connections)
+
+
+def test_cached_graph_follows_world_file(tmp_path: Path):
+    world = tmp_path / 'canon' / 'world.yml'
+    world.parent.mkdir()
+    world.write_text("locations:\n  - id: L-A\n    connected_to: [L-B]\n"
+                     "  - id: L-B\n    connected_to: [L-C]\n  - id: L-C\n", encoding='utf-8')
+    assert LocationGraph.for_repo(tmp_path).distance('L-A', 'L-C') == 2
+
+    world.write_text("locations:\n  - id: L-A\n    connected_to: [L-B]\n"
+                     "  - id: L-B\n  - id: L-C\n", encoding='utf-8')
+    graph = LocationGraph.for_repo(tmp_path)
+    assert graph.distance('L-A', 'L-C') is None
+    assert graph.hops == all_pairs_hops({'L-A': ['L-B'], 'L-B': [], 'L-C': []})